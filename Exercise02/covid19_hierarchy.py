@@ -0,0 +1,104 @@
+import sys
+import numpy as np
+
+from covid19_statistics import REGIONS, N_PEOPLE, N_COVID, normalize_data, calc_ratio
+
+
+class RegionHierarchy:
+    # Province -> city -> district totals, every subtree is a contiguous range of leaves,
+    # so any (subtree, date range) sum is four lookups in a 2D prefix-sum table
+    def __init__(self, paths, n_people, capacity=366):
+        paths = [tuple(path) for path in paths]
+        self.order = np.array(sorted(range(len(paths)), key=lambda idx: paths[idx]))  # Depth-first leaf order
+        self.paths = [paths[idx] for idx in self.order]
+        self.ranges = {}
+        self.child_names = {}
+        for leaf, path in enumerate(self.paths):
+            for depth in range(len(path) + 1):
+                node = path[:depth]
+                lo, _ = self.ranges.get(node, (leaf, leaf))
+                self.ranges[node] = (lo, leaf + 1)
+                if depth < len(path):
+                    self.child_names.setdefault(node, [])
+                    if path[depth] not in self.child_names[node]:
+                        self.child_names[node].append(path[depth])
+        self.people_prefix = np.concatenate(([0], np.cumsum(np.asarray(n_people, dtype=np.int64)[self.order])))
+        self.n_days = 0
+        self.prefix = np.zeros((capacity + 1, len(paths) + 1), dtype=np.int64)
+
+    @classmethod
+    def from_store(cls, store, paths):
+        # Build from a 'covid19_timeseries.CaseStore', 'paths' follow 'store.regions'
+        hierarchy = cls(paths, store.n_people, capacity=max(store.n_days, 1))
+        for cases in store.cases[:store.n_days]:
+            hierarchy.add_day(cases)
+        return hierarchy
+
+    def add_day(self, n_cases):
+        # Append one day of leaf cases (in the given leaf order) in O(leaves)
+        if self.n_days + 1 >= len(self.prefix):
+            grown = np.zeros((2*len(self.prefix), self.prefix.shape[1]), dtype=np.int64)
+            grown[:self.n_days + 1] = self.prefix[:self.n_days + 1]
+            self.prefix = grown
+        cases = np.asarray(n_cases, dtype=np.int64)[self.order]
+        self.prefix[self.n_days + 1, 1:] = self.prefix[self.n_days, 1:] + np.cumsum(cases)
+        self.n_days += 1
+
+    def children(self, path=()):
+        return [tuple(path) + (name,) for name in self.child_names.get(tuple(path), [])]
+
+    def node_range(self, path=()):
+        try:
+            return self.ranges[tuple(path)]
+        except KeyError:
+            raise ValueError(f'Unknown region: {"/".join(path)}')
+
+    def _sum_cases(self, lo, hi, start, end):
+        # Works on scalars and on arrays of ranges, 'start' and 'end' are day indices ([start, end))
+        p = self.prefix
+        return p[end, hi] - p[start, hi] - p[end, lo] + p[start, lo]
+
+    def _day_range(self, start, end):
+        start = 0 if start is None else start
+        end = self.n_days if end is None else end
+        return start, end
+
+    def total_people(self, path=()):
+        lo, hi = self.node_range(path)
+        return self.people_prefix[hi] - self.people_prefix[lo]
+
+    def total_cases(self, path=(), start=None, end=None):
+        lo, hi = self.node_range(path)
+        return self._sum_cases(lo, hi, *self._day_range(start, end))
+
+    def query(self, paths, start=None, end=None):
+        # Cases and people of many nodes at once, e.g. for a dashboard refresh
+        ranges = np.array([self.node_range(path) for path in paths]).reshape(-1, 2)
+        lo, hi = ranges[:, 0], ranges[:, 1]
+        cases = self._sum_cases(lo, hi, *self._day_range(start, end))
+        people = self.people_prefix[hi] - self.people_prefix[lo]
+        return cases, people
+
+    def rate(self, path=(), start=None, end=None, scale=1000000):
+        return normalize_data(self.total_cases(path, start, end), self.total_people(path), scale)
+
+    def children_table(self, path=(), start=None, end=None):
+        children = self.children(path)
+        cases, people = self.query(children, start, end)
+        title = ' / '.join(path) if path else 'Korea'
+        lines = [f'### COVID-19 New Cases in {title}',
+                 f'* Total population: {people.sum()}',
+                 f'* Total new cases: {cases.sum()}',
+                 '',
+                 '| Region | Population | New Cases | Ratio (%) | New Cases / 1M |',
+                 '| ------ | ---------- | --------- | --------- | --------- |']
+        lines += ['| %s | %d | %d | %.1f | %.1f |' % (child[-1], n_people, n_cases, ratio, norm)
+                  for child, n_people, n_cases, ratio, norm in zip(children, people, cases, calc_ratio(cases),
+                                                                    normalize_data(cases, people, 1000000))]
+        return '\n'.join(lines) + '\n\n'
+
+
+if __name__ == '__main__':
+    hierarchy = RegionHierarchy([(region,) for region in REGIONS], N_PEOPLE)
+    hierarchy.add_day(N_COVID)
+    sys.stdout.write(hierarchy.children_table())
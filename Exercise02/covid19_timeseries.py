@@ -0,0 +1,126 @@
+import datetime
+import glob
+import os
+import sys
+import numpy as np
+
+from covid19_statistics import REGIONS, N_PEOPLE, N_COVID, normalize_data, write_report
+
+
+class CaseStore:
+    # Append-only (date, region) store of daily new cases, one row per calendar day
+    def __init__(self, regions, n_people, window=7, capacity=366):
+        self.regions = np.asarray(regions)
+        self.n_people = np.asarray(n_people)
+        self.region_index = {region: idx for idx, region in enumerate(self.regions)}
+        self.window = window
+        self.first_date = None
+        self.n_days = 0
+        self.cases = np.zeros((capacity, len(self.regions)), dtype=np.int64)
+        self.rolling = np.zeros((capacity, len(self.regions)), dtype=np.int64)  # The sum of the last 'window' days
+
+    def _grow(self, n_days):
+        if n_days > len(self.cases):
+            capacity = max(2*len(self.cases), n_days)
+            for name in ('cases', 'rolling'):
+                grown = np.zeros((capacity, len(self.regions)), dtype=np.int64)
+                grown[:self.n_days] = getattr(self, name)[:self.n_days]
+                setattr(self, name, grown)
+
+    def day_index(self, date):
+        return (datetime.date.fromisoformat(str(date)) - self.first_date).days
+
+    def date_of(self, idx):
+        return (self.first_date + datetime.timedelta(days=int(idx))).isoformat()
+
+    def append_day(self, date, n_cases):
+        # Add one day in O(regions), skipped days are stored as days without cases
+        if self.first_date is None:
+            self.first_date = datetime.date.fromisoformat(str(date))
+        t = self.day_index(date)
+        if t < self.n_days:
+            raise ValueError(f'{date} is not after the last stored date {self.date_of(self.n_days - 1)}')
+        self._grow(t + 1)
+        while self.n_days <= t:
+            day = self.n_days
+            if day == t:
+                self.cases[day] = n_cases
+            prev = self.rolling[day - 1] if day > 0 else 0
+            dropped = self.cases[day - self.window] if day >= self.window else 0
+            self.rolling[day] = prev + self.cases[day] - dropped
+            self.n_days += 1
+
+    def ingest(self, filename, date=None):
+        # A daily file has 'region, new cases' lines, its date is taken from the file name by default
+        if date is None:
+            date = os.path.splitext(os.path.basename(filename))[0]
+        n_cases = np.zeros(len(self.regions), dtype=np.int64)
+        with open(filename, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                region, cases = [word.strip() for word in line.split(',')]
+                if region not in self.region_index:
+                    raise ValueError(f'Unknown region: {region}')
+                n_cases[self.region_index[region]] += int(cases)
+        self.append_day(date, n_cases)
+
+    def ingest_files(self, pattern):
+        for filename in sorted(glob.glob(pattern)):
+            self.ingest(filename)
+
+    def _range(self, start=None, end=None):
+        first = 0 if start is None else max(self.day_index(start), 0)
+        last = self.n_days if end is None else min(self.day_index(end) + 1, self.n_days)
+        return first, last
+
+    def view(self, start=None, end=None):
+        # Dates and new cases in [start, end] without copying the stored rows
+        first, last = self._range(start, end)
+        return [self.date_of(t) for t in range(first, last)], self.cases[first:last]
+
+    def rolling_per_million(self, start=None, end=None):
+        first, last = self._range(start, end)
+        return normalize_data(self.rolling[first:last], self.n_people, 1000000)
+
+    def growth(self, start=None, end=None):
+        # Week-over-week growth of the rolling sums, NaN where the previous window is empty
+        first, last = self._range(start, end)
+        now = self.rolling[first:last].astype(float)
+        before = np.zeros_like(now)
+        shifted = np.arange(first, last) - self.window
+        valid = shifted >= 0
+        before[valid] = self.rolling[shifted[valid]]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(before > 0, now / before - 1, np.nan)
+
+    def rolling_table(self, date):
+        t = self.day_index(date)
+        rolling = self.rolling[t]
+        per_million = self.rolling_per_million(date, date)[0]
+        growth = self.growth(date, date)[0]*100
+        lines = [f'### Korean COVID-19 {self.window}-Day Cases by Region ({self.date_of(t)})',
+                 f'* Total {self.window}-day cases: {rolling.sum()}',
+                 '',
+                 f'| Region | {self.window}-Day Cases | {self.window}-Day Cases / 1M | Week-over-Week (%) |',
+                 '| ------ | ---------- | --------- | --------- |']
+        growth = ['%+.1f' % g if np.isfinite(g) else 'n/a' for g in growth]  # No previous window to compare
+        lines += ['| %s | %d | %.1f | %s |' % row for row in zip(self.regions, rolling, per_million, growth)]
+        return '\n'.join(lines) + '\n\n'
+
+    def write_report(self, out, start=None, end=None):
+        dates, n_covid = self.view(start, end)
+        write_report(out, self.regions, self.n_people, n_covid, dates=dates)
+        if dates:
+            out.write(self.rolling_table(dates[-1]))
+
+
+if __name__ == '__main__':
+    store = CaseStore(REGIONS, N_PEOPLE)
+    if len(sys.argv) > 1:  # e.g. 'python covid19_timeseries.py "daily/*.csv" 2021-09-01 2021-09-21'
+        store.ingest_files(sys.argv[1])
+        store.write_report(sys.stdout, *sys.argv[2:4])
+    else:
+        store.append_day('2021-09-21', N_COVID)
+        store.write_report(sys.stdout)
@@ -1,53 +1,231 @@
-def read_data(filename):
-    data = []
-    with open(filename, 'r') as f:
-        for line in f.readlines():
-            line = line.strip()
-            if not line.startswith('#'):  # We don't read lines which are starting with a comment sign
-                line = line.split(', ')
-                f_list = [float(x) for x in line]
-                data.append(f_list)
-    return data
+import mmap
+import os
+import sys
+from functools import reduce
+from itertools import islice
+
+import numpy as np
+
+
+def _iter_lines(f, use_mmap):
+    if use_mmap:
+        if os.fstat(f.fileno()).st_size == 0:  # An empty file cannot be mapped
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for line in iter(mm.readline, b''):
+                yield line.decode()
+    else:
+        yield from f
+
+
+def iter_chunks(filename, chunk_size=65536, use_mmap=False):
+    # Yields column-major arrays of at most 'chunk_size' rows
+    with open(filename, 'rb' if use_mmap else 'r') as f:
+        lines = _iter_lines(f, use_mmap)
+        while chunk := list(islice(lines, chunk_size)):
+            chunk = [line for line in chunk if line.strip() and not line.strip().startswith('#')]  # We don't read lines which are starting with a comment sign
+            if chunk:
+                yield np.loadtxt(chunk, delimiter=',', ndmin=2).T
+
+
+def read_data(filename, chunk_size=65536, use_mmap=False):
+    # Returns column-major data, so 'data[c]' is the c-th column as a contiguous array
+    data = None
+    n_rows = 0
+    for values in iter_chunks(filename, chunk_size, use_mmap):
+        n_new = values.shape[1]
+        if data is None:
+            data = np.empty((values.shape[0], max(chunk_size, n_new)))
+        elif n_rows + n_new > data.shape[1]:  # Grow the column buffers geometrically
+            grown = np.empty((data.shape[0], max(2*data.shape[1], n_rows + n_new)))
+            grown[:, :n_rows] = data[:, :n_rows]
+            data = grown
+        data[:, n_rows:n_rows + n_new] = values
+        n_rows += n_new
+    if data is None:
+        return np.empty((0, 0))
+    return np.ascontiguousarray(data[:, :n_rows])
+
+
+def weighted_totals(scores, weights, out=None):
+    # Totals of (n x k) 'scores' for every (m x k) weight scheme as one (n x m) matrix product
+    weights = np.atleast_2d(np.asarray(weights, dtype=float))
+    if out is None:
+        out = np.empty((len(scores), len(weights)))
+    return np.matmul(scores, weights.T, out=out)
 
 
 def add_weighted_average(data, weight):
-    for row in data:
-        midterm = row[0]
-        final = row[1]
-        total = weight[0]*midterm + weight[1]*final
-        row.append(total)
+    # Returns a new column-major array with the 'Total' column appended, 'data' is not modified
+    out = np.empty((len(data) + 1, data.shape[1]))
+    out[:-1] = data
+    weighted_totals(data.T, [weight], out=out[-1:].T)
+    return out
+
+
+def find_quantile(data, q):
+    # Select the q-quantile along the last axis with introselect instead of a full sort
+    n = data.shape[-1]
+    pos = q*(n - 1)
+    lo = int(pos)
+    hi = min(lo + 1, n - 1)
+    part = np.partition(data, (lo, hi), axis=-1)
+    return part[..., lo] + (pos - lo)*(part[..., hi] - part[..., lo])
 
 
 def analyze_data(data):
-    data_length = len(data)
-    mean = sum(data)/data_length
-    var = sum([(x - mean)**2 for x in data])/data_length
-    sorted_data = sorted(data)
-    median = (sorted_data[data_length//2] + sorted_data[data_length//2 + 1]) / 2 if data_length % 2 == 0 else sorted_data[data_length//2]
-    return mean, var, median, min(data), max(data)
+    # Analyze every column of 'data' at once, each statistic is returned per column
+    data = np.asarray(data, dtype=float)
+    mean = data.mean(axis=-1)
+    var = data.var(axis=-1)
+    median = find_quantile(data, 0.5)
+    return mean, var, median, data.min(axis=-1), data.max(axis=-1)
+
+
+class QuantileSketch:
+    # KLL sketch, keeps O(k log(n/k)) items and merges with other sketches
+    # The compaction coin is seeded, so the same data gives the same quantiles in every run
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.seed = seed
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k*(2/3)**depth)), 2)
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                keep = items[-1:] if len(items) % 2 else items[:0]  # An odd item stays on its level
+                items = items[:len(items) - len(keep)]
+                promoted = items[self.rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate((self.levels[level + 1], promoted))
+            level += 1
+
+    def update(self, values):
+        self.levels[0] = np.concatenate((self.levels[0], np.ravel(values)))
+        self._compress()
+
+    def merge(self, other):
+        merged = QuantileSketch(self.k, self.seed)
+        merged.rng = self.rng
+        n_levels = max(len(self.levels), len(other.levels))
+        merged.levels = [np.concatenate((self.levels[h] if h < len(self.levels) else np.empty(0),
+                                         other.levels[h] if h < len(other.levels) else np.empty(0)))
+                         for h in range(n_levels)]
+        merged._compress()
+        return merged
+
+    def quantile(self, q):
+        if len(self.levels) == 1:  # Nothing is compacted yet, so every item has weight 1 and the quantile is exact
+            return find_quantile(self.levels[0], q) if len(self.levels[0]) else np.nan
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2**h) for h, items in enumerate(self.levels)])
+        order = np.argsort(values)
+        values, weights = values[order], weights[order]
+        # An item of weight w stands for w equal ranks, so it sits at their center and
+        # the rank q*(W - 1) is interpolated between two items like in 'find_quantile'
+        cum_weights = np.cumsum(weights)
+        ranks = cum_weights - (weights + 1)/2
+        return np.interp(q*(cum_weights[-1] - 1), ranks, values)
+
+
+class ScoreSummary:
+    # Mergeable column-wise summary (count, mean, M2, min, max and a quantile sketch)
+    def __init__(self, n_cols, k=200, seed=0):
+        self.k = k
+        self.seed = seed
+        self.count = 0
+        self.mean = np.zeros(n_cols)
+        self.m2 = np.zeros(n_cols)
+        self.min = np.full(n_cols, np.inf)
+        self.max = np.full(n_cols, -np.inf)
+        self.sketches = [QuantileSketch(k, seed) for _ in range(n_cols)]
+
+    @classmethod
+    def from_data(cls, data, k=200, seed=0):
+        summary = cls(len(data), k, seed)
+        if data.size:
+            summary.count = data.shape[1]
+            summary.mean = data.mean(axis=1)
+            summary.m2 = ((data - summary.mean[:, None])**2).sum(axis=1)
+            summary.min = data.min(axis=1)
+            summary.max = data.max(axis=1)
+            for sketch, column in zip(summary.sketches, data):
+                sketch.update(column)
+        return summary
+
+    def merge(self, other):
+        # Chan et al.'s pairwise update, so summaries combine in any order
+        merged = ScoreSummary(len(self.mean), self.k, self.seed)
+        merged.count = self.count + other.count
+        if merged.count:
+            delta = other.mean - self.mean
+            merged.mean = self.mean + delta*other.count/merged.count
+            merged.m2 = self.m2 + other.m2 + delta**2*self.count*other.count/merged.count
+        merged.min = np.minimum(self.min, other.min)
+        merged.max = np.maximum(self.max, other.max)
+        merged.sketches = [a.merge(b) for a, b in zip(self.sketches, other.sketches)]
+        return merged
+
+    def __add__(self, other):
+        return self.merge(other)
+
+    def analyze(self):
+        # Same statistics as 'analyze_data', but from the summary only
+        median = np.array([sketch.quantile(0.5) for sketch in self.sketches])
+        if not self.count:  # Only empty shards were merged
+            return tuple(np.full(len(self.mean), np.nan) for _ in range(5))
+        return self.mean, self.m2/self.count, median, self.min, self.max
+
+
+def summarize_shard(filename, weight, k=200):
+    data = read_data(filename)
+    if not data.size:  # An empty shard (or one with comments only) adds nothing to the merged summary
+        return ScoreSummary(len(weight) + 1, k)
+    return ScoreSummary.from_data(add_weighted_average(data, weight), k)
+
+
+def format_analysis(col_name, stats, title='Examination Analysis'):
+    lines = [f'### {title}']
+    for c, (mean, var, median, min_, max_) in enumerate(zip(*stats)):
+        lines.append(f'* {col_name[c]}')
+        lines.append(f'  * Mean: **{mean:.3f}**')
+        lines.append(f'  * Variance: {var:.3f}')
+        lines.append(f'  * Median: **{median:.3f}**')
+        lines.append(f'  * Min/Max: ({min_:.3f}, {max_:.3f})')
+    return '\n'.join(lines)
+
+
+def print_analysis(col_name, stats):
+    print(format_analysis(col_name, stats))
 
 
 if __name__ == '__main__':
+    col_name = ['Midterm', 'Final', 'Total']
+    if len(sys.argv) > 1:  # Summarize score shards, e.g. 'python class_score_analysis.py shard*.csv'
+        summary = reduce(ScoreSummary.merge, (summarize_shard(shard, [40/125, 60/100]) for shard in sys.argv[1:]))
+        print_analysis(col_name, summary.analyze())
+        sys.exit()
+
     data = read_data('data/class_score_en.csv')
-    if data and len(data[0]) == 2: # Check 'data' is valid
-        add_weighted_average(data, [40/125, 60/100])
-        if len(data[0]) == 3:      # Check 'data' is valid
+    if data.size and len(data) == 2: # Check 'data' is valid
+        data = add_weighted_average(data, [40/125, 60/100])
+        if len(data) == 3:           # Check 'data' is valid
             print('### Individual Score')
             print()
             print('| Midterm | Final | Total |')
             print('| ------- | ----- | ----- |')
-            for row in data:
+            for row in data.T:
                 print(f'| {row[0]} | {row[1]} | {row[2]:.3f} |')
             print()
 
-            print('### Examination Analysis')
-            col_n = len(data[0])
-            col_name = ['Midterm', 'Final', 'Total']
-            colwise_data = [ [row[c] for row in data] for c in range(col_n) ]
-            for c, score in enumerate(colwise_data):
-                mean, var, median, min_, max_ = analyze_data(score)
-                print(f'* {col_name[c]}')
-                print(f'  * Mean: **{mean:.3f}**')
-                print(f'  * Variance: {var:.3f}')
-                print(f'  * Median: **{median:.3f}**')
-                print(f'  * Min/Max: ({min_:.3f}, {max_:.3f})')
\ No newline at end of file
+            print_analysis(col_name, analyze_data(data))
@@ -0,0 +1,90 @@
+import argparse
+import glob
+import hashlib
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+
+from class_score_analysis import read_data, add_weighted_average, analyze_data, ScoreSummary, format_analysis
+
+COL_NAME = ['Midterm', 'Final', 'Total']
+WEIGHT = [40/125, 60/100]
+
+
+def find_files(patterns):
+    filenames = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, '*.csv')
+        filenames.update(os.path.abspath(f) for f in glob.glob(pattern))
+    return sorted(filenames)  # Sorted, so the report is the same regardless of the worker order
+
+
+def cache_path(cache_dir, filename, weight):
+    stat = os.stat(filename)
+    key = f'{filename}|{stat.st_mtime_ns}|{stat.st_size}|{weight}'
+    return os.path.join(cache_dir, hashlib.sha1(key.encode()).hexdigest() + '.pkl')
+
+
+def analyze_file(filename, weight=WEIGHT, cache_dir=None):
+    cached = cache_path(cache_dir, filename, weight) if cache_dir else None
+    if cached and os.path.exists(cached):
+        with open(cached, 'rb') as f:
+            return pickle.load(f)
+
+    data = read_data(filename)
+    if not data.size or len(data) != 2:  # Check 'data' is valid
+        result = None
+    else:
+        data = add_weighted_average(data, weight)
+        result = (data.shape[1], analyze_data(data), ScoreSummary.from_data(data))
+
+    if cached:
+        with open(cached + '.tmp', 'wb') as f:
+            pickle.dump(result, f)
+        os.replace(cached + '.tmp', cached)
+    return result
+
+
+def build_report(filenames, weight=WEIGHT, cache_dir=None, max_workers=None):
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(analyze_file, filenames, [weight]*len(filenames), [cache_dir]*len(filenames),
+                                chunksize=max(1, len(filenames)//64)))
+
+    sections = []
+    summaries = []
+    for filename, result in zip(filenames, results):
+        name = os.path.relpath(filename)
+        if result is None:
+            sections.append(f'### {name}\n* Skipped: invalid score data')
+            continue
+        n_students, stats, summary = result
+        sections.append(format_analysis(COL_NAME, stats, title=f'{name} ({n_students} students)'))
+        summaries.append(summary)
+
+    if summaries:
+        summary = reduce(ScoreSummary.merge, summaries)
+        sections.insert(0, format_analysis(COL_NAME, summary.analyze(),
+                                           title=f'All Files ({len(summaries)} files, {summary.count} students)'))
+    return '\n\n'.join(sections) + '\n'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Combined examination report over many score files')
+    parser.add_argument('patterns', nargs='+', help='score CSV files, glob patterns or directories')
+    parser.add_argument('-o', '--output', help='markdown file to write (default: stdout)')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='the number of worker processes')
+    parser.add_argument('--cache-dir', default='.score_cache', help='directory for cached per-file results')
+    parser.add_argument('--no-cache', action='store_true', help='analyze every file again')
+    args = parser.parse_args()
+
+    report = build_report(find_files(args.patterns), cache_dir=None if args.no_cache else args.cache_dir,
+                          max_workers=args.jobs)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
+    else:
+        print(report, end='')
@@ -0,0 +1,182 @@
+import glob
+import heapq
+import random
+import weakref
+from collections import deque
+
+from maze_core import (play_games, RandomBot, RUNNER, CHASER, WALL, EXIT, STEP_FLAGS, MOVES)
+
+INF = float('inf')
+
+
+def neighbors(idx, width, height):
+    x_pos, y_pos = divmod(idx, height)
+    for dx, dy in MOVES.values():
+        nx, ny = x_pos + dx, y_pos + dy
+        if 0 <= nx < width and 0 <= ny < height:
+            yield nx * height + ny
+
+
+class DistanceField:
+    # BFS distances to the nearest source tile, kept up to date when tiles get blocked
+    def __init__(self, level, sources, blocked_flags=WALL):
+        self.width = level.width
+        self.height = level.height
+        self.blocked = bytearray(1 if tile & blocked_flags else 0 for tile in level.grid)
+        self.sources = {x_pos * self.height + y_pos for x_pos, y_pos in sources if not self.blocked[x_pos * self.height + y_pos]}
+        self.dist = [INF] * len(level.grid)
+        queue = deque()
+        for idx in self.sources:
+            self.dist[idx] = 0
+            queue.append(idx)
+        while queue:
+            idx = queue.popleft()
+            for nbr in neighbors(idx, self.width, self.height):
+                if not self.blocked[nbr] and self.dist[nbr] == INF:
+                    self.dist[nbr] = self.dist[idx] + 1
+                    queue.append(nbr)
+
+    def copy(self):
+        field = DistanceField.__new__(DistanceField)
+        field.width, field.height = self.width, self.height
+        field.blocked, field.sources, field.dist = bytearray(self.blocked), set(self.sources), list(self.dist)
+        return field
+
+    def __getitem__(self, tile):
+        x_pos, y_pos = tile
+        if 0 <= x_pos < self.width and 0 <= y_pos < self.height:
+            return self.dist[x_pos * self.height + y_pos]
+        return INF
+
+    def _supported(self, idx, affected):
+        return idx in self.sources or any(self.dist[nbr] == self.dist[idx] - 1 and nbr not in affected
+                                          for nbr in neighbors(idx, self.width, self.height) if not self.blocked[nbr])
+
+    def block(self, tile):
+        # Only tiles whose shortest paths all went through 'tile' are repaired, O(k log k) for k of them
+        idx = tile[0] * self.height + tile[1]
+        if self.blocked[idx]:
+            return
+        self.blocked[idx] = 1
+        self.sources.discard(idx)
+        if self.dist[idx] == INF:
+            return
+
+        # Collect the tiles which lost every shortest path, level by level
+        affected = {idx}
+        queue = deque(nbr for nbr in neighbors(idx, self.width, self.height) if self.dist[nbr] == self.dist[idx] + 1)
+        while queue:
+            v = queue.popleft()
+            if v in affected or self.blocked[v] or self._supported(v, affected):
+                continue
+            affected.add(v)
+            queue.extend(nbr for nbr in neighbors(v, self.width, self.height) if self.dist[nbr] == self.dist[v] + 1)
+
+        # Recompute them from their unaffected borders
+        for v in affected:
+            self.dist[v] = INF
+        heap = []
+        for v in affected:
+            if self.blocked[v]:
+                continue
+            best = min((self.dist[nbr] + 1 for nbr in neighbors(v, self.width, self.height) if not self.blocked[nbr]), default=INF)
+            if best < INF:
+                self.dist[v] = best
+                heap.append((best, v))
+        heapq.heapify(heap)
+        while heap:
+            d, v = heapq.heappop(heap)
+            if d > self.dist[v]:
+                continue
+            for nbr in neighbors(v, self.width, self.height):
+                if nbr in affected and not self.blocked[nbr] and d + 1 < self.dist[nbr]:
+                    self.dist[nbr] = d + 1
+                    heapq.heappush(heap, (d + 1, nbr))
+
+
+_exit_fields = weakref.WeakKeyDictionary()  # Level -> {blocked_flags: DistanceField}, freed with the level
+
+
+def exit_field(level, blocked_flags=WALL):
+    # A copy of the distance field to the exits of 'level', the BFS runs once per level and flags
+    fields = _exit_fields.setdefault(level, {})
+    if blocked_flags not in fields:
+        fields[blocked_flags] = DistanceField(level, level.tiles(EXIT), blocked_flags)
+    return fields[blocked_flags].copy()
+
+
+def local_distances(state, source, radius, blocked_flags=WALL):
+    # BFS distances from 'source' up to 'radius' steps, O(radius^2) whatever the size of the map
+    height = state.height
+    start = source[0] * height + source[1]
+    dist = {start: 0}
+    queue = deque([start])
+    while queue:
+        idx = queue.popleft()
+        if dist[idx] >= radius:
+            continue
+        for nbr in neighbors(idx, state.width, height):
+            if nbr not in dist and not state.grid[nbr] & blocked_flags:
+                dist[nbr] = dist[idx] + 1
+                queue.append(nbr)
+    return dist
+
+
+class PathfindingBot:
+    # Greedy AI mover over one distance field to the exits per level, a bot for 'maze_core.play_game'
+    # and the turtle front end, the opponent is only searched in a small neighborhood
+    chase_radius = 12
+
+    def __init__(self, side, seed=None):
+        self.side = side
+        self.rng = random.Random(seed)
+        self.level = None
+        self.exit_field = None
+        self.last_tile = None
+
+    def _prepare(self, state):
+        if self.level is not state.level:
+            self.level = state.level
+            self.exit_field = exit_field(state.level, WALL | STEP_FLAGS[self.side])
+            self.last_tile = None
+        if self.last_tile is not None and state.get_tile(self.last_tile) & STEP_FLAGS[self.side]:
+            self.exit_field.block(self.last_tile)  # A footprint or hoof-print is lethal to step on again
+        self.last_tile = state.positions[self.side]
+
+    def choose_move(self, state):
+        self._prepare(state)
+        x_pos, y_pos = state.positions[self.side]
+        opponent = state.positions[1 - self.side]
+        near = {}
+        if self.side == CHASER and abs(x_pos - opponent[0]) + abs(y_pos - opponent[1]) <= self.chase_radius + 1:
+            near = local_distances(state, opponent, self.chase_radius, WALL | STEP_FLAGS[CHASER])
+        candidates = []
+        for direction in state.legal_moves(self.side):
+            dx, dy = MOVES[direction]
+            tile = (x_pos + dx, y_pos + dy)
+            candidates.append((self.score(state, tile, opponent, near), self.rng.random(), direction))
+        return min(candidates)[2] if candidates else None
+
+    def score(self, state, tile, opponent, near=None):
+        own_step = state.get_tile(tile) & STEP_FLAGS[self.side]
+        if self.side == RUNNER:
+            if state.get_tile(tile) & EXIT:
+                return (0, 0)
+            caught = abs(tile[0] - opponent[0]) + abs(tile[1] - opponent[1]) <= 1  # Next to the chaser
+            return (bool(own_step), caught, self.exit_field[tile])
+        if tile == opponent:
+            return (0, 0)
+
+        # Chase the runner when it is close, otherwise head for the exits it is going to
+        idx = tile[0] * state.height + tile[1]
+        if idx in near:
+            return (bool(own_step), 0, near[idx])
+        return (bool(own_step), 1, self.exit_field[tile])
+
+
+if __name__ == '__main__':
+    levels = sorted(glob.glob('*.csv') + glob.glob('*.maze'))
+    for runner_bot, chaser_bot in [(PathfindingBot, RandomBot), (RandomBot, PathfindingBot), (PathfindingBot, PathfindingBot)]:
+        results = play_games(levels, runner_bot, chaser_bot, n_games=200)
+        winners = [winner for _, winner, _ in results]
+        print(f'{runner_bot.__name__} vs {chaser_bot.__name__}: runner {winners.count(RUNNER)}, chaser {winners.count(CHASER)}')
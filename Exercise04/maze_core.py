@@ -0,0 +1,202 @@
+import glob
+import random
+from multiprocessing import Pool
+
+TURN_TIME = 5
+
+# Occupancy grid flags
+WALL = 1
+EXIT = 2
+HUMAN_STEP = 4
+MINOTAUR_STEP = 8
+
+# Sides
+RUNNER = 0
+CHASER = 1
+STEP_FLAGS = (HUMAN_STEP, MINOTAUR_STEP)
+
+MOVES = {
+    'Up': (0, -1),
+    'Down': (0, 1),
+    'Left': (-1, 0),
+    'Right': (1, 0),
+}
+
+
+class Level:
+    # Static part of a map, tiles are indexed as grid[x * height + y]
+    def __init__(self, width, height, grid, runner_start, chaser_start, name=''):
+        self.width = width
+        self.height = height
+        self.grid = grid
+        self.runner_start = runner_start
+        self.chaser_start = chaser_start
+        self.name = name
+
+    def tiles(self, flag):
+        return [(idx // self.height, idx % self.height) for idx, tile in enumerate(self.grid) if tile & flag]
+
+
+def parse_level(rows, name=''):
+    width, height = len(rows), max(len(line) for line in rows)
+    grid = bytearray(width * height)
+    runner_start = chaser_start = None
+    for x_pos, line in enumerate(rows):
+        for y_pos, map_obj in enumerate(line):
+            try:
+                map_obj = int(map_obj)
+            except ValueError:
+                raise ValueError("Invalid map object, must be a number")
+
+            match map_obj:
+                case 1:
+                    grid[x_pos * height + y_pos] = WALL
+                case 2:
+                    grid[x_pos * height + y_pos] = EXIT
+                case 3:
+                    runner_start = (x_pos, y_pos)
+                case 4:
+                    chaser_start = (x_pos, y_pos)
+    if runner_start is None or chaser_start is None:
+        raise ValueError("Map must have one runner and one chaser")
+    return Level(width, height, grid, runner_start, chaser_start, name)
+
+
+def read_level(filename):
+    with open(filename, 'r') as f:
+        rows = [line.strip().split(',') for line in f.readlines() if line.strip()]
+    return parse_level(rows, filename)
+
+
+class GameState:
+    # Rules of the game on a plain grid, without any rendering or timers
+    def __init__(self, level, turn_time=TURN_TIME):
+        self.level = level
+        self.width = level.width
+        self.height = level.height
+        self.grid = bytearray(level.grid)
+        self.positions = [level.runner_start, level.chaser_start]
+        self.turn_time = turn_time
+        self.turn = RUNNER
+        self.timer = turn_time
+        self.winner = None
+        self.n_moves = 0
+        self.n_ticks = 0
+        self.recorder = None  # e.g. 'maze_replay.Recorder', gets every move and the end of the game
+
+    def copy(self):
+        state = GameState.__new__(GameState)
+        state.__dict__.update(self.__dict__)
+        state.grid = bytearray(self.grid)
+        state.positions = list(self.positions)
+        state.recorder = None
+        return state
+
+    def get_tile(self, tile):
+        # Tiles outside the map behave like walls
+        x_pos, y_pos = tile
+        if 0 <= x_pos < self.width and 0 <= y_pos < self.height:
+            return self.grid[x_pos * self.height + y_pos]
+        return WALL
+
+    def mark_tile(self, tile, flag):
+        self.grid[tile[0] * self.height + tile[1]] |= flag
+
+    def legal_moves(self, side=None):
+        side = self.turn if side is None else side
+        x_pos, y_pos = self.positions[side]
+        return [direction for direction, (dx, dy) in MOVES.items() if not self.get_tile((x_pos + dx, y_pos + dy)) & WALL]
+
+    def move(self, side, direction):
+        # Returns False if the move is not allowed (not the side's turn, game over or a wall)
+        if self.winner is not None or side != self.turn:
+            return False
+        dx, dy = MOVES[direction]
+        old_tile = self.positions[side]
+        new_tile = (old_tile[0] + dx, old_tile[1] + dy)
+        tile = self.get_tile(new_tile)
+        if tile & WALL:
+            return False
+
+        self.positions[side] = new_tile
+        self.mark_tile(old_tile, STEP_FLAGS[side])
+        self.n_moves += 1
+        if side == CHASER:
+            if new_tile == self.positions[RUNNER]:
+                self.winner = CHASER
+            elif tile & MINOTAUR_STEP:
+                self.winner = RUNNER
+        else:
+            if tile & EXIT:
+                self.winner = RUNNER
+            elif tile & HUMAN_STEP:
+                self.winner = CHASER
+        self.turn = 1 - side
+        self.timer = self.turn_time
+        if self.recorder is not None:
+            self.recorder.record_move(self, side, direction)
+            if self.winner is not None:
+                self.recorder.record_end(self)
+        return True
+
+    def tick(self):
+        # One second of the turn timer, the side on turn loses when it runs out
+        if self.winner is None:
+            self.n_ticks += 1
+            self.timer -= 1
+            if self.timer <= 0:
+                self.winner = 1 - self.turn
+                if self.recorder is not None:
+                    self.recorder.record_end(self)
+        return self.winner
+
+
+class RandomBot:
+    # A bot is created per game as bot(side, seed) and asked for a move with choose_move(state)
+    def __init__(self, side, seed=None):
+        self.side = side
+        self.rng = random.Random(seed)
+
+    def choose_move(self, state):
+        moves = state.legal_moves(self.side)
+        return self.rng.choice(moves) if moves else None
+
+
+def play_game(level, runner_bot, chaser_bot, seed=None, max_moves=None, recorder=None):
+    # 'runner_bot' and 'chaser_bot' are bot classes, a bot passing (None) runs out of time
+    state = GameState(level)
+    if recorder is not None:
+        state.recorder = recorder
+        recorder.start_level(level)
+    bots = (runner_bot(RUNNER, seed), chaser_bot(CHASER, None if seed is None else seed + 1))
+    while state.winner is None:
+        if max_moves is not None and state.n_moves >= max_moves:
+            break
+        direction = bots[state.turn].choose_move(state)
+        if direction is None or not state.move(state.turn, direction):
+            while state.tick() is None:
+                pass
+    if recorder is not None and state.winner is None:
+        recorder.record_end(state)
+    return state.winner, state.n_moves
+
+
+def _play_game(args):
+    return play_game(*args)
+
+
+def play_games(levels, runner_bot, chaser_bot, n_games, seed=0, processes=None, max_moves=None):
+    # Play 'n_games' on every level across a process pool, results follow the order of the games
+    from maze_levels import load_level  # 'maze_levels' imports this module
+    levels = [load_level(level) if isinstance(level, str) else level for level in levels]
+    games = [(level, runner_bot, chaser_bot, seed + 2 * idx, max_moves) for level in levels for idx in range(n_games)]
+    with Pool(processes) as pool:
+        results = pool.map(_play_game, games, chunksize=max(1, len(games) // (4 * (processes or 8))))
+    return [(level.name, winner, n_moves) for (level, *_), (winner, n_moves) in zip(games, results)]
+
+
+if __name__ == '__main__':
+    results = play_games(sorted(glob.glob('*.csv') + glob.glob('*.maze')), RandomBot, RandomBot, n_games=1000)
+    for name in sorted({name for name, _, _ in results}):
+        winners = [winner for level, winner, _ in results if level == name]
+        print(f'{name}: runner {winners.count(RUNNER)}, chaser {winners.count(CHASER)}, draw {winners.count(None)}')
@@ -0,0 +1,157 @@
+import argparse
+import mmap
+import random
+import struct
+from collections import deque
+
+from maze_core import (Level, read_level, WALL, EXIT, MOVES)
+
+# Packed level: header, then 2 bits per tile (0 - empty, 1 - wall, 2 - exit) in grid order
+PACKED_MAGIC = b'MAZE'
+PACKED_HEADER = struct.Struct('<4sBIIIIII')  # magic, version, width, height, runner x/y, chaser x/y
+PACKED_VERSION = 1
+_UNPACK_TABLES = [bytes((byte >> (2 * k)) & 3 for byte in range(256)) for k in range(4)]
+
+
+def pack_tiles(grid):
+    # Four tiles per byte, the first tile in the lowest bits
+    grid = bytes(grid) + bytes(-len(grid) % 4)
+    packed = 0
+    for k in range(4):
+        packed |= int.from_bytes(grid[k::4], 'little') << (2 * k)
+    return packed.to_bytes(len(grid) // 4, 'little')
+
+
+def unpack_tiles(data, n_tiles):
+    grid = bytearray(4 * len(data))
+    for k, table in enumerate(_UNPACK_TABLES):
+        grid[k::4] = data.translate(table)
+    del grid[n_tiles:]
+    return grid
+
+
+def write_packed(level, filename):
+    with open(filename, 'wb') as f:
+        f.write(PACKED_HEADER.pack(PACKED_MAGIC, PACKED_VERSION, level.width, level.height,
+                                   *level.runner_start, *level.chaser_start))
+        f.write(pack_tiles(level.grid))
+
+
+def read_packed(filename):
+    with open(filename, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        magic, version, width, height, rx, ry, cx, cy = PACKED_HEADER.unpack_from(mm)
+        if magic != PACKED_MAGIC or version != PACKED_VERSION:
+            raise ValueError(f'{filename} is not a packed level')
+        n_tiles = width * height
+        data = mm[PACKED_HEADER.size:PACKED_HEADER.size + (n_tiles + 3) // 4]
+    return Level(width, height, unpack_tiles(data, n_tiles), (rx, ry), (cx, cy), filename)
+
+
+def write_csv(level, filename):
+    with open(filename, 'w') as f:
+        for x_pos in range(level.width):
+            row = [str(tile) for tile in level.grid[x_pos * level.height:(x_pos + 1) * level.height]]
+            if x_pos == level.runner_start[0]:
+                row[level.runner_start[1]] = '3'
+            if x_pos == level.chaser_start[0]:
+                row[level.chaser_start[1]] = '4'
+            f.write(','.join(row) + '\n')
+
+
+def load_level(filename):
+    if filename.endswith('.csv'):
+        return read_level(filename)
+    return read_packed(filename)
+
+
+def flood_fill(level, start):
+    # Distances from 'start' over non-wall tiles, -1 for unreachable tiles
+    height, grid = level.height, level.grid
+    n_tiles = len(grid)
+    dist = [-1] * n_tiles
+    start = start[0] * height + start[1]
+    dist[start] = 0
+    queue = deque([start])
+    while queue:
+        idx = queue.popleft()
+        y_pos = idx % height
+        d = dist[idx] + 1
+        for nbr, inside in ((idx - height, idx >= height), (idx + height, idx + height < n_tiles),
+                            (idx - 1, y_pos > 0), (idx + 1, y_pos < height - 1)):
+            if inside and dist[nbr] < 0 and not grid[nbr] & WALL:
+                dist[nbr] = d
+                queue.append(nbr)
+    return dist
+
+
+def is_solvable(level, dist=None):
+    # An exit must be reachable from the runner, 'dist' can reuse a flood fill from the runner
+    if dist is None:
+        dist = flood_fill(level, level.runner_start)
+    return any(dist[idx] > 0 for idx, tile in enumerate(level.grid) if tile & EXIT)
+
+
+def generate_level(width, height, seed=None, n_exits=2, loop_ratio=0.05, name=''):
+    # A seeded maze with corridors on odd tiles, a few extra openings make loops
+    rng = random.Random(seed)
+    width, height = max(width | 1, 5), max(height | 1, 5)  # Corridors need odd sizes
+    grid = bytearray([WALL]) * (width * height)
+    cells = [(x_pos, y_pos) for x_pos in range(1, width - 1, 2) for y_pos in range(1, height - 1, 2)]
+
+    # Carve a spanning tree with an iterative depth-first search
+    start = rng.choice(cells)
+    grid[start[0] * height + start[1]] = 0
+    stack = [start]
+    while stack:
+        x_pos, y_pos = stack[-1]
+        options = [(dx, dy) for dx, dy in MOVES.values()
+                   if 0 < x_pos + 2 * dx < width - 1 and 0 < y_pos + 2 * dy < height - 1
+                   and grid[(x_pos + 2 * dx) * height + y_pos + 2 * dy] & WALL]
+        if not options:
+            stack.pop()
+            continue
+        dx, dy = rng.choice(options)
+        grid[(x_pos + dx) * height + y_pos + dy] = 0
+        grid[(x_pos + 2 * dx) * height + y_pos + 2 * dy] = 0
+        stack.append((x_pos + 2 * dx, y_pos + 2 * dy))
+
+    # Knock down some inner walls between two corridors
+    for x_pos in range(1, width - 1):
+        for y_pos in range(1, height - 1):
+            if (x_pos + y_pos) % 2 and rng.random() < loop_ratio:
+                grid[x_pos * height + y_pos] = 0
+
+    # Exits on the border next to a corridor
+    border = [(0, y_pos, 1, y_pos) for y_pos in range(1, height - 1, 2)] + \
+             [(width - 1, y_pos, width - 2, y_pos) for y_pos in range(1, height - 1, 2)] + \
+             [(x_pos, 0, x_pos, 1) for x_pos in range(1, width - 1, 2)] + \
+             [(x_pos, height - 1, x_pos, height - 2) for x_pos in range(1, width - 1, 2)]
+    for x_pos, y_pos, _, _ in rng.sample(border, min(n_exits, len(border))):
+        grid[x_pos * height + y_pos] = EXIT
+
+    runner_start = rng.choice(cells)
+    level = Level(width, height, grid, runner_start, runner_start, name)
+    dist = flood_fill(level, runner_start)
+    max_dist = max(dist)
+    far = [cell for cell in cells if dist[cell[0] * height + cell[1]] >= max_dist // 2]
+    level.chaser_start = rng.choice(far)
+    if not is_solvable(level, dist):
+        raise ValueError('Generated level is not solvable')
+    return level
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a solvable maze level')
+    parser.add_argument('width', type=int)
+    parser.add_argument('height', type=int)
+    parser.add_argument('-o', '--output', default='generated.maze', help='a .maze (packed) or .csv file')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--exits', type=int, default=2)
+    parser.add_argument('--loops', type=float, default=0.05, help='the ratio of removed inner walls')
+    args = parser.parse_args()
+
+    level = generate_level(args.width, args.height, args.seed, args.exits, args.loops, args.output)
+    if args.output.endswith('.csv'):
+        write_csv(level, args.output)
+    else:
+        write_packed(level, args.output)
@@ -0,0 +1,148 @@
+import argparse
+import struct
+import zlib
+
+from maze_core import (GameState, RUNNER, CHASER, WALL, EXIT, HUMAN_STEP, MINOTAUR_STEP, MOVES)
+from maze_levels import load_level
+
+# Session file: a header, then one record per level start, move and level end
+REPLAY_MAGIC = b'MZRP'
+REPLAY_VERSION = 1
+LEVEL_RECORD = struct.Struct('<cIH')  # b'L', crc32 of the level grid, name length (the name follows)
+MOVE_RECORD = struct.Struct('<cIB')   # b'M', tick, side << 2 | direction
+END_RECORD = struct.Struct('<cIB')    # b'E', tick, winner (255 if nobody won)
+DIRECTIONS = list(MOVES)
+NO_WINNER = 255
+
+
+class Recorder:
+    # Writes every move of a session as a compact binary stream
+    def __init__(self, filename):
+        self.file = open(filename, 'wb')
+        self.file.write(REPLAY_MAGIC + bytes([REPLAY_VERSION]))
+
+    def start_level(self, level):
+        name = level.name.encode()
+        self.file.write(LEVEL_RECORD.pack(b'L', zlib.crc32(level.grid), len(name)) + name)
+
+    def record_move(self, state, side, direction):
+        self.file.write(MOVE_RECORD.pack(b'M', state.n_ticks, side << 2 | DIRECTIONS.index(direction)))
+
+    def record_end(self, state):
+        self.file.write(END_RECORD.pack(b'E', state.n_ticks, NO_WINNER if state.winner is None else state.winner))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class ReplayGame:
+    # One recorded level, any turn can be rebuilt from the nearest snapshot
+    def __init__(self, level_name, crc, moves, end_tick, winner, snapshot_every=64):
+        self.level_name = level_name
+        self.crc = crc
+        self.moves = moves  # [(tick, side, direction), ...]
+        self.end_tick = end_tick
+        self.winner = winner
+        self.snapshot_every = snapshot_every
+        self.snapshots = None
+
+    def new_state(self, level=None):
+        level = load_level(self.level_name) if level is None else level
+        if zlib.crc32(level.grid) != self.crc:
+            raise ValueError(f'{self.level_name} differs from the recorded level')
+        return GameState(level)
+
+    @staticmethod
+    def apply(state, tick, side, direction):
+        while state.n_ticks < tick:
+            state.tick()
+        if not state.move(side, direction):
+            raise ValueError(f'Move {state.n_moves} ({direction}) cannot be replayed')
+
+    def play(self, level=None):
+        # Replay the whole game as fast as possible and keep a snapshot every 'snapshot_every' moves
+        state = self.new_state(level)
+        self.snapshots = [state.copy()]
+        for idx, move in enumerate(self.moves):
+            self.apply(state, *move)
+            if (idx + 1) % self.snapshot_every == 0:
+                self.snapshots.append(state.copy())
+        if self.end_tick is not None:
+            while state.winner is None and state.n_ticks < self.end_tick:
+                state.tick()
+        return state
+
+    def seek(self, turn, level=None):
+        # The state after 'turn' moves, replaying at most 'snapshot_every' moves
+        if self.snapshots is None:
+            self.play(level)
+        turn = max(0, min(turn, len(self.moves)))
+        state = self.snapshots[turn // self.snapshot_every].copy()
+        for move in self.moves[state.n_moves:turn]:
+            self.apply(state, *move)
+        return state
+
+
+def read_replay(filename, snapshot_every=64):
+    with open(filename, 'rb') as f:
+        data = f.read()
+    if data[:4] != REPLAY_MAGIC or data[4] != REPLAY_VERSION:
+        raise ValueError(f'{filename} is not a replay file')
+    games = []
+    offset = 5
+    game = None
+    while offset < len(data):
+        match data[offset:offset + 1]:
+            case b'L':
+                _, crc, name_len = LEVEL_RECORD.unpack_from(data, offset)
+                offset += LEVEL_RECORD.size
+                game = ReplayGame(data[offset:offset + name_len].decode(), crc, [], None, None, snapshot_every)
+                games.append(game)
+                offset += name_len
+            case b'M':
+                _, tick, action = MOVE_RECORD.unpack_from(data, offset)
+                game.moves.append((tick, action >> 2, DIRECTIONS[action & 3]))
+                offset += MOVE_RECORD.size
+            case b'E':
+                _, tick, winner = END_RECORD.unpack_from(data, offset)
+                game.end_tick, game.winner = tick, None if winner == NO_WINNER else winner
+                offset += END_RECORD.size
+            case _:
+                raise ValueError(f'Broken replay record at byte {offset}')
+    return games
+
+
+def draw_state(state):
+    # Plain text view of a state as it is drawn on the screen
+    symbols = {WALL: '#', EXIT: 'E', HUMAN_STEP: '.', MINOTAUR_STEP: ',', HUMAN_STEP | MINOTAUR_STEP: ':'}
+    lines = []
+    for y_pos in range(state.height):
+        line = ''
+        for x_pos in range(state.width):
+            if (x_pos, y_pos) == state.positions[RUNNER]:
+                line += 'R'
+            elif (x_pos, y_pos) == state.positions[CHASER]:
+                line += 'C'
+            else:
+                line += symbols.get(state.get_tile((x_pos, y_pos)), ' ')
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay recorded maze sessions without rendering')
+    parser.add_argument('replay', help='a file recorded with "turtle_game.py --record"')
+    parser.add_argument('--game', type=int, default=None, help='the index of the game to show')
+    parser.add_argument('--turn', type=int, default=None, help='show the game after this many moves')
+    args = parser.parse_args()
+
+    games = read_replay(args.replay)
+    winner_names = {RUNNER: 'runner', CHASER: 'chaser', None: 'nobody'}
+    for idx, game in enumerate(games):
+        if args.game is not None and idx != args.game:
+            continue
+        state = game.play()
+        print(f'{idx}: {game.level_name}, {len(game.moves)} moves, {state.n_ticks} ticks, {winner_names[state.winner]} won')
+        if args.turn is not None:
+            print(draw_state(game.seek(args.turn)))
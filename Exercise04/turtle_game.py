@@ -1,13 +1,23 @@
 import turtle
 import glob
-import time
+import sys
 import warnings
 
+from maze_core import (GameState, RUNNER, CHASER, WALL, EXIT, HUMAN_STEP, MINOTAUR_STEP)
+from maze_ai import PathfindingBot
+from maze_levels import load_level
+from maze_replay import Recorder
+
 # global scope variables
 WORLD_SIZE = 600
 TILE_SIZE = 32
 ROTATION_ANGLE = 90
-TURN_TIME = 5
+VIEW_SIZE = (15, 18)  # Visible tiles (x, y), the right side of the screen keeps the score
+CAMERA_MARGIN = 2     # The camera scrolls when the active mover gets this close to the edge
+
+
+def tile_to_pos(tile, camera=(0, 0)):
+    return (tile[0] - camera[0]) * TILE_SIZE + TILE_SIZE / 2, WORLD_SIZE - (tile[1] - camera[1]) * TILE_SIZE - TILE_SIZE / 2
 
 
 class Singleton(type):
@@ -19,13 +29,42 @@ class Singleton(type):
         return cls._instances[cls]
 
 
+class SpritePool:
+    # Reuses hidden sprites across levels instead of creating new turtles
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.free = {}
+
+    def acquire(self, sprite_class, position):
+        free = self.free.get(sprite_class)
+        if not free:
+            return sprite_class(self.canvas, position)
+        sprite = free.pop()
+        sprite.setpos(position)
+        sprite.showturtle()
+        return sprite
+
+    def release(self, sprites):
+        for sprite in sprites:
+            sprite.hideturtle()
+            self.free.setdefault(type(sprite), []).append(sprite)
+
+
 class RunawayGame(metaclass=Singleton):
+    # Turtle front end, the rules are played by 'maze_core.GameState'
+    state = None
     runner = None
     chaser = None
     walls = []
     human_steps = []
     minotaur_steps = []
     exits = []
+    bot_classes = {}  # Sides played by AI movers, e.g. {CHASER: PathfindingBot}
+    bots = {}
+    pool = None
+    recorder = None  # 'maze_replay.Recorder' of the session, if it is recorded
+    camera = (0, 0)
+    timer_id = None
     timer_msec = 1000
     score_drawer = None
     drawer = None
@@ -37,7 +76,8 @@ class RunawayGame(metaclass=Singleton):
     @classmethod
     def __init__(cls, canvas):
         cls.canvas = canvas
-        cls.levels = glob.glob('*.csv')
+        cls.pool = SpritePool(canvas)
+        cls.levels = sorted(glob.glob('*.csv') + glob.glob('*.maze'))
         # Instantiate turtle for drawing
         cls.drawer = turtle.RawTurtle(cls.canvas)
         cls.drawer.hideturtle()
@@ -52,31 +92,41 @@ class RunawayGame(metaclass=Singleton):
 
     @classmethod
     def start(cls):
-        cls.runner.turn = True
         cls.level_finished = False
-        cls.canvas.ontimer(cls.step, cls.timer_msec)
+        cls.schedule_step()
+
+    @classmethod
+    def schedule_step(cls):
+        cls.timer_id = cls.canvas.getcanvas().after(cls.timer_msec, cls.step)
+
+    @classmethod
+    def cancel_step(cls):
+        if cls.timer_id is not None:
+            cls.canvas.getcanvas().after_cancel(cls.timer_id)
+            cls.timer_id = None
 
     @classmethod
     def step(cls):
+        cls.timer_id = None
         cls.score_drawer.clear()
         cls.drawer.clear()
         cls.score_drawer.write(f'Runner: {cls.runner_score} Chaser: {cls.chaser_score}', font=('Arial', 10, 'bold'))
-        if cls.runner is not None and cls.chaser is not None:
+        if cls.state is not None:
             try:
-                if cls.runner.turn:
-                    cls.drawer.write(f'Runners turn. Remaining time: {cls.runner.timer} s', font=('Arial', 8, 'normal'))
-                    cls.runner.timer -= 1
-
-                    if cls.runner.timer <= 0.0:
-                        cls.chaser.on_win()
-                elif cls.chaser.turn:
-                    cls.drawer.write(f'Chaser turn. Remaining time: {cls.runner.timer} s', font=('Arial', 8, 'normal'))
-                    cls.chaser.timer -= 1
-
-                    if cls.chaser.timer <= 0.0:
-                        cls.runner.on_win()
-                if not cls.level_finished:
-                    cls.canvas.ontimer(cls.step, cls.timer_msec)
+                state = cls.state
+                if state.turn in cls.bots:
+                    direction = cls.bots[state.turn].choose_move(state)
+                    mover = cls.runner if state.turn == RUNNER else cls.chaser
+                    if direction is not None:
+                        mover.check_collision(direction)
+                    if cls.state is not state:  # The move finished the level, the next one has its own timer
+                        return
+                side = 'Runners' if state.turn == RUNNER else 'Chaser'
+                cls.drawer.write(f'{side} turn. Remaining time: {state.timer} s', font=('Arial', 8, 'normal'))
+                if state.tick() is not None:
+                    cls.on_win(state.winner)  # 'next_level' schedules the timer of the next level
+                    return
+                cls.schedule_step()
             except AttributeError as ae:
                 warnings.warn(ae, RuntimeWarning)
                 if not cls.levels:
@@ -84,175 +134,204 @@ class RunawayGame(metaclass=Singleton):
                 else:
                     cls.next_level()
 
+    @classmethod
+    def on_win(cls, side):
+        if side == RUNNER:
+            cls.runner_score += 1
+        elif side == CHASER:
+            cls.chaser_score += 1
+        cls.next_level()
 
     @classmethod
     def next_level(cls):
         cls.level_finished = True
-        cls.runner.turn = False
-        cls.chaser.turn = False
-        cls.canvas.clear()
-        cls.canvas.bgcolor('#F8F400')
+        cls.cancel_step()
         cls.on_destroy()
         if cls.levels:
             cls.read_map(cls.levels.pop(0))
             cls.start()
         else:
+            cls.runner.hideturtle()
+            cls.chaser.hideturtle()
+            cls.drawer.clear()
             cls.drawer.setpos(250, 300)
             cls.drawer.write(f'THE END. \n THANKS FOR PLAYING', align='center', font=('Arial', 18, 'normal'))
             cls.canvas.exitonclick()
 
     @classmethod
-    def on_destroy(cls):
+    def on_destroy(cls, keep_state=False):
+        for sprites in (cls.walls, cls.exits, cls.human_steps, cls.minotaur_steps):
+            cls.pool.release(sprites)
         cls.walls = []
-        for idx, _ in enumerate(cls.human_steps):
-            cls.human_steps[idx] = None
+        cls.exits = []
         cls.human_steps = []
-        for idx, _ in enumerate(cls.minotaur_steps):
-            cls.minotaur_steps[idx] = None
         cls.minotaur_steps = []
-        time.sleep(1) # We need to wait 1 s because of the timer racing condition !
-        cls.runner = None
-        cls.chaser = None
+        if not keep_state:
+            cls.state = None
+
+    @classmethod
+    def to_screen(cls, tile):
+        return tile_to_pos(tile, cls.camera)
+
+    @classmethod
+    def in_view(cls, tile):
+        return 0 <= tile[0] - cls.camera[0] < VIEW_SIZE[0] and 0 <= tile[1] - cls.camera[1] < VIEW_SIZE[1]
+
+    @classmethod
+    def fits_view(cls):
+        return cls.state.width <= VIEW_SIZE[0] and cls.state.height <= VIEW_SIZE[1]
+
+    @classmethod
+    def follow(cls, tile):
+        # Center the camera on 'tile' when it comes close to the edge of the view, returns True if it moved
+        def follow_axis(pos, cam, view, size):
+            if cam + CAMERA_MARGIN <= pos < cam + view - CAMERA_MARGIN:
+                return cam
+            return min(max(pos - view // 2, 0), max(size - view, 0))
+
+        camera = (follow_axis(tile[0], cls.camera[0], VIEW_SIZE[0], cls.state.width),
+                  follow_axis(tile[1], cls.camera[1], VIEW_SIZE[1], cls.state.height))
+        if camera == cls.camera:
+            return False
+        cls.camera = camera
+        return True
+
+    @classmethod
+    def render_view(cls):
+        # Sprites exist only for the visible tiles, so the cost depends on the screen size, not the map size
+        cls.canvas.tracer(0)  # Place every tile first and draw them at once
+        cls.on_destroy(keep_state=True)
+        for x_pos in range(cls.camera[0], min(cls.camera[0] + VIEW_SIZE[0], cls.state.width)):
+            for y_pos in range(cls.camera[1], min(cls.camera[1] + VIEW_SIZE[1], cls.state.height)):
+                tile = cls.state.get_tile((x_pos, y_pos))
+                if not tile:
+                    continue
+                position = cls.to_screen((x_pos, y_pos))
+                if tile & WALL:
+                    cls.walls.append(cls.pool.acquire(Wall, position))
+                if tile & EXIT:
+                    cls.exits.append(cls.pool.acquire(Exit, position))
+                if tile & HUMAN_STEP:
+                    cls.human_steps.append(cls.pool.acquire(HumanStep, position))
+                if tile & MINOTAUR_STEP:
+                    cls.minotaur_steps.append(cls.pool.acquire(MinotaurStep, position))
+        cls.runner.place()
+        cls.chaser.place()
+        cls.canvas.update()
+        cls.canvas.tracer(1)
+
+    @classmethod
+    def after_move(cls, mover, old_tile):
+        if cls.follow(cls.state.positions[cls.state.turn]):
+            cls.render_view()
+            return
+        mover.show_at()
+        if cls.in_view(old_tile):
+            mover.leave_step(cls.to_screen(old_tile))
 
     @classmethod
     def read_map(cls, filename):
-        with open(filename, 'r') as f:
-            for x_pos, line in enumerate(f.readlines()):
-                line = line.strip()
-                line = line.split(',')
-                for y_pos, map_obj in enumerate(line):
-                    try:
-                        map_obj = int(map_obj)
-                    except ValueError:
-                        raise ValueError("Invalid map object, must be a number")
-
-                    match map_obj:
-                        case 1:
-                            wall = Wall(cls.canvas, (
-                                x_pos * TILE_SIZE + TILE_SIZE / 2, WORLD_SIZE - y_pos * TILE_SIZE - TILE_SIZE / 2))
-                            cls.walls.append(wall)
-                        case 2:
-                            cls.exits.append(Exit(cls.canvas,
-                                                  (x_pos * TILE_SIZE + TILE_SIZE / 2,
-                                                   WORLD_SIZE - y_pos * TILE_SIZE - TILE_SIZE / 2)))
-                        case 3:
-                            cls.runner = Runner(canvas=cls.canvas,
-                                                position=(x_pos * TILE_SIZE + TILE_SIZE / 2,
-                                                          WORLD_SIZE - y_pos * TILE_SIZE - TILE_SIZE / 2),
-                                                moveset={
-                                                    'Up': 'Up',
-                                                    'Down': 'Down',
-                                                    'Left': 'Left',
-                                                    'Right': 'Right',
-
-                                                }
-                                                )
-                        case 4:
-                            cls.chaser = Chaser(canvas=cls.canvas,
-                                                position=(x_pos * TILE_SIZE + TILE_SIZE / 2,
-                                                          WORLD_SIZE - y_pos * TILE_SIZE - TILE_SIZE / 2),
-                                                moveset={
-                                                    'Up': 'w',
-                                                    'Down': 's',
-                                                    'Left': 'a',
-                                                    'Right': 'd',
-
-                                                },
-                                                )
+        level = load_level(filename)
+        cls.state = GameState(level)
+        if cls.recorder is not None:
+            cls.state.recorder = cls.recorder
+            cls.recorder.start_level(level)
+        cls.bots = {side: bot_class(side) for side, bot_class in cls.bot_classes.items()}
+        if cls.runner is None:
+            cls.runner = Runner(canvas=cls.canvas,
+                                side=RUNNER,
+                                moveset={
+                                    'Up': 'Up',
+                                    'Down': 'Down',
+                                    'Left': 'Left',
+                                    'Right': 'Right',
+
+                                }
+                                )
+        if cls.chaser is None:
+            cls.chaser = Chaser(canvas=cls.canvas,
+                                side=CHASER,
+                                moveset={
+                                    'Up': 'w',
+                                    'Down': 's',
+                                    'Left': 'a',
+                                    'Right': 'd',
+
+                                },
+                                )
+        cls.camera = (0, 0)
+        cls.follow(level.runner_start)
+        cls.render_view()
 
 
 class ManualMover(turtle.RawTurtle):
 
-    def __init__(self, canvas, position, moveset):
+    def __init__(self, canvas, side, moveset):
         super().__init__(canvas)
         self.step_move = TILE_SIZE
         self.step_turn = ROTATION_ANGLE
+        self.side = side
         self.penup()
-        self.setpos(position)
-        self.turn = False
-        self.timer = TURN_TIME
 
         # Register event handlers
-        canvas.onkeypress(lambda: self.check_collision(moveset['Up']), moveset['Up'])
-        canvas.onkeypress(lambda: self.check_collision(moveset['Down']), moveset['Down'])
-        canvas.onkeypress(lambda: self.check_collision(moveset['Left']), moveset['Left'])
-        canvas.onkeypress(lambda: self.check_collision(moveset['Right']), moveset['Right'])
+        canvas.onkeypress(lambda: self.check_collision('Up'), moveset['Up'])
+        canvas.onkeypress(lambda: self.check_collision('Down'), moveset['Down'])
+        canvas.onkeypress(lambda: self.check_collision('Left'), moveset['Left'])
+        canvas.onkeypress(lambda: self.check_collision('Right'), moveset['Right'])
         canvas.listen()
 
-    def check_collision(self, move_set):
-        if self.turn:
-            old_position = self.pos()
-            new_position = old_position
-            match move_set:
-                case 'Up' | 'w':
-                    new_position = (old_position[0], old_position[1] + TILE_SIZE)
-                case 'Down' | 's':
-                    new_position = (old_position[0], old_position[1] - TILE_SIZE)
-                case 'Left' | 'a':
-                    new_position = (old_position[0] - TILE_SIZE, old_position[1])
-                case 'Right' | 'd':
-                    new_position = (old_position[0] + TILE_SIZE, old_position[1])
-            self.setpos(new_position)
-            for wall in RunawayGame.walls:
-                p = wall.pos()
-                q = self.pos()
-                dx, dy = p[0] - q[0], p[1] - q[1]
-                if dx ** 2 + dy ** 2 < TILE_SIZE:
-                    self.setpos(old_position)
-                    return
+    def show_at(self):
+        tile = RunawayGame.state.positions[self.side]
+        self.setpos(RunawayGame.to_screen(tile))
+        if RunawayGame.in_view(tile):
+            self.showturtle()
+        else:
+            self.hideturtle()
 
-            if isinstance(self, Chaser):
-                self.turn = False
-                RunawayGame.chaser.timer = TURN_TIME
-                RunawayGame.minotaur_steps.append(MinotaurStep(RunawayGame.canvas, old_position))
-                if self.distance(RunawayGame.runner) < TILE_SIZE:
-                    self.on_win()
-                for step in RunawayGame.minotaur_steps:
-                    if self.distance(step) < TILE_SIZE:
-                        RunawayGame.runner.on_win()
-                RunawayGame.runner.turn = True
-
-            if isinstance(self, Runner):
-                self.turn = False
-                RunawayGame.runner.timer = TURN_TIME
-                RunawayGame.human_steps.append(HumanStep(RunawayGame.canvas, old_position))
-                for exit in RunawayGame.exits:
-                    try:
-                        if self.distance(exit) < TILE_SIZE:
-                            self.on_win()
-                    except UnboundLocalError as ule:
-                        warnings.warn(ule, RuntimeWarning)
-                for step in RunawayGame.human_steps:
-                    try:
-                        if self.distance(step) < TILE_SIZE:
-                            RunawayGame.chaser.on_win()
-                    except UnboundLocalError as ule:
-                        warnings.warn(ule, RuntimeWarning)
-                RunawayGame.chaser.turn = True
+    def place(self):
+        # Move to the current tile after the level or the camera changed and drop the old trail
+        self.penup()
+        self.clear()
+        self.show_at()
 
+    def check_collision(self, direction):
+        state = RunawayGame.state
+        if state is None:
             return
+        old_tile = state.positions[self.side]
+        if state.move(self.side, direction):
+            RunawayGame.after_move(self, old_tile)
+            if state.winner is not None:
+                RunawayGame.on_win(state.winner)
+
+    def leave_step(self, position):
+        pass
 
-    def on_win(self):
-        if isinstance(self, Runner):
-            RunawayGame.runner_score += 1
-        elif isinstance(self, Chaser):
-            RunawayGame.chaser_score += 1
-        RunawayGame.next_level()
 
 class Runner(ManualMover):
 
-    def __init__(self, canvas, position, moveset):
-        super().__init__(canvas, position, moveset)
+    def __init__(self, canvas, side, moveset):
+        super().__init__(canvas, side, moveset)
         self.shape('theseus_32.gif')
-        self.pendown()
         self.pen(pencolor="blue")
 
+    def place(self):
+        super().place()
+        if RunawayGame.fits_view():  # Ariadne's thread is drawn on maps without scrolling
+            self.pendown()
+
+    def leave_step(self, position):
+        RunawayGame.human_steps.append(RunawayGame.pool.acquire(HumanStep, position))
+
 
 class Chaser(ManualMover):
-    def __init__(self, canvas, position, moveset):
-        super().__init__(canvas, position, moveset)
+    def __init__(self, canvas, side, moveset):
+        super().__init__(canvas, side, moveset)
         self.shape('minotaur_32.gif')
 
+    def leave_step(self, position):
+        RunawayGame.minotaur_steps.append(RunawayGame.pool.acquire(MinotaurStep, position))
+
 
 class InActiveObject(turtle.RawTurtle):
     def __init__(self, canvas, position):
@@ -278,7 +357,6 @@ class HumanStep(InActiveObject):
     def __init__(self, canvas, position):
         super().__init__(canvas, position)
         self.shape('human_step.gif')
-        RunawayGame.human_steps.append(self)
 
 
 class MinotaurStep(InActiveObject):
@@ -300,6 +378,12 @@ if __name__ == '__main__':
     canvas.addshape("human_step.gif")
     canvas.addshape("minotaur_step.gif")
 
+    if '--runner-ai' in sys.argv:
+        RunawayGame.bot_classes[RUNNER] = PathfindingBot
+    if '--chaser-ai' in sys.argv:
+        RunawayGame.bot_classes[CHASER] = PathfindingBot
+    if '--record' in sys.argv:
+        RunawayGame.recorder = Recorder(sys.argv[sys.argv.index('--record') + 1])
     game = RunawayGame(canvas)
     game.start()
     canvas.mainloop()
@@ -1,7 +1,24 @@
-import matplotlib
-import matplotlib.pyplot as plt
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Exercise03'))
+from class_score_analysis import weighted_totals, iter_chunks
+
+PLOT_VERSION = 1  # Change it when the look of the plots changes, so cached images are rendered again
+WEIGHT = [40/125, 60/100]
+MIDTERM_RANGE = (0, 125)
+FINAL_RANGE = (0, 100)
+TOTAL_RANGE = (0, 100)
+CLASSES = [
+    {'name': 'English', 'file': 'data/class_score_en.csv', 'marker': 'b+', 'color': 'blue'},
+    {'name': 'Korean', 'file': 'data/class_score_kr.csv', 'marker': 'r.', 'color': 'red'},
+]
 
-matplotlib.use('TKAgg')
 
 def read_data(filename):
     data = []
@@ -9,50 +26,190 @@ def read_data(filename):
         for line in f.readlines():
             if not line.startswith('#'): # If 'line' is not a header
                 data.append([int(word) for word in line.split(',')])
-    return data
+    return np.array(data)
 
-if __name__ == '__main__':
-    # Load score data
-    class_kr = read_data('data/class_score_kr.csv')
-    class_en = read_data('data/class_score_en.csv')
 
-    # TODO) Prepare midterm, final, and total scores
-    midtm_kr = [midtm for (midtm, _) in class_kr]
-    final_kr = [final for (_, final) in class_kr]
-    total_kr = [40/125*midtm + 60/100*final for (midtm, final) in class_kr]
+def bin_index(values, value_range, bins):
+    # The same bins as 'np.histogram', the last bin includes its right edge
+    lo, hi = value_range
+    idx = np.floor((values - lo) * bins / (hi - lo)).astype(np.int64)
+    idx[values == hi] = bins - 1
+    return idx, (idx >= 0) & (idx < bins)
+
+
+class ScoreDensity:
+    # Counts of (midterm, final) pairs and of total scores, updated chunk by chunk
+    def __init__(self, bins=(25, 20), total_bins=20):
+        self.bins = bins
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.total_counts = np.zeros(total_bins, dtype=np.int64)
+
+    @classmethod
+    def from_file(cls, filename, chunk_size=1000000, **kwargs):
+        density = cls(**kwargs)
+        for chunk in iter_chunks(filename, chunk_size):
+            density.update(chunk)
+        return density
+
+    def update(self, chunk):
+        # 'chunk' is column-major, chunk[0] midterm and chunk[1] final scores
+        ix, in_x = bin_index(chunk[0], MIDTERM_RANGE, self.bins[0])
+        iy, in_y = bin_index(chunk[1], FINAL_RANGE, self.bins[1])
+        valid = in_x & in_y
+        self.counts += np.bincount(ix[valid] * self.bins[1] + iy[valid], minlength=self.counts.size).reshape(self.bins)
+        total = weighted_totals(chunk.T, WEIGHT)[:, 0]
+        it, in_t = bin_index(total, TOTAL_RANGE, len(self.total_counts))
+        self.total_counts += np.bincount(it[in_t], minlength=len(self.total_counts))
+        return self
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.total_counts += other.total_counts
+        return self
+
 
-    midtm_en, final_en = zip(*class_en)
+def load_pyplot(backend):
+    # matplotlib (and Tk for 'TKAgg') is imported only when a plot is requested
+    import matplotlib
+    matplotlib.use(backend)
+    import matplotlib.pyplot as plt
+    return plt
 
-    total_en = [40/125*midtm + 60/100*final for (midtm, final) in class_en]
 
-    # TODO) Plot midterm/final scores as points
-    plt.figure(1)
-    plt.plot(midtm_en, final_en, 'b+', label='English')
-    plt.plot(midtm_kr, final_kr, 'r.', label='Korean')
+def plot_scatter(plt, classes):
+    fig = plt.figure(1)
+    for c in classes:
+        midtm, final = c['data'].T
+        plt.plot(midtm, final, c['marker'], label=c['name'])
     plt.grid()
     plt.xlim(0, 125)
     plt.xlabel('Midterm scores')
     plt.ylim(0, 100)
     plt.ylabel('Final scores')
     plt.legend()
-    plt.show()
-
-    # TODO) Plot total scores as a histogram
-
-    plt.figure(2)
-    plt.hist(total_en,
-             range=(0, 100),
-             bins=20,
-             color="blue",
-             alpha=0.5,
-             label='English')  # bin width = histogram range / number of bins
-    plt.hist(total_kr,
-             range=(0, 100),
-             bins=20,
-             color="red",
-             alpha=0.5,
-             label='Korean')   # 5 = 100 / bins -> bins = 20
+    return fig
+
+
+def plot_hist(plt, classes, bins=20):
+    fig = plt.figure(2)
+    for c in classes:
+        total = weighted_totals(c['data'], WEIGHT)[:, 0]
+        plt.hist(total,
+                 range=(0, 100),
+                 bins=bins,
+                 color=c['color'],
+                 alpha=0.5,
+                 label=c['name'])  # bin width = histogram range / number of bins
+    plt.xlabel('Total scores')
+    plt.ylabel('The number of students')
+    plt.legend()
+    return fig
+
+
+def plot_density(plt, classes):
+    # All classes are blended into one image, the color of a bin darkens with log(count)
+    from matplotlib.colors import to_rgb
+    fig = plt.figure(1)
+    image = np.ones(classes[0]['density'].counts.T.shape + (3,))
+    for c in classes:
+        counts = c['density'].counts.T  # Rows are final scores
+        level = np.log1p(counts) / max(np.log1p(counts.max()), 1)
+        image -= level[..., None] * (1 - np.array(to_rgb(c['color'])))
+        plt.plot([], [], 's', color=c['color'], label=c['name'])
+    plt.imshow(np.clip(image, 0, 1), origin='lower', extent=(*MIDTERM_RANGE, *FINAL_RANGE),
+               aspect='auto', interpolation='nearest')
+    plt.grid()
+    plt.xlim(*MIDTERM_RANGE)
+    plt.xlabel('Midterm scores')
+    plt.ylim(*FINAL_RANGE)
+    plt.ylabel('Final scores')
+    plt.legend()
+    return fig
+
+
+def plot_density_hist(plt, classes):
+    fig = plt.figure(2)
+    for c in classes:
+        counts = c['density'].total_counts
+        plt.stairs(counts, np.linspace(*TOTAL_RANGE, len(counts) + 1), fill=True, color=c['color'], alpha=0.5,
+                   label=c['name'])
     plt.xlabel('Total scores')
     plt.ylabel('The number of students')
     plt.legend()
-    plt.show()
\ No newline at end of file
+    return fig
+
+
+PLOTS = {'scatter': plot_scatter, 'hist': plot_hist}
+DENSITY_PLOTS = {'scatter': plot_density, 'hist': plot_density_hist}
+
+
+def load_classes(classes, density=False):
+    for c in classes:
+        if density and 'density' not in c:
+            c['density'] = ScoreDensity.from_file(c['file'])
+        elif not density and 'data' not in c:
+            c['data'] = read_data(c['file'])
+
+
+def plot_key(classes, plot_name, params):
+    # Content hash of the input files and everything else which changes the image
+    h = hashlib.sha256()
+    for c in classes:
+        file_hash = hashlib.sha256()
+        with open(c['file'], 'rb') as f:
+            while block := f.read(1 << 20):  # Large files are hashed in chunks
+                file_hash.update(block)
+        h.update(file_hash.digest())
+        h.update(json.dumps({key: c[key] for key in ('name', 'marker', 'color')}, sort_keys=True).encode())
+    h.update(json.dumps({'plot': plot_name, 'version': PLOT_VERSION, 'weight': WEIGHT, **params}, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def save_plots(classes, out_dir, fmt='png', dpi=100, cache_dir='.plot_cache', density=False):
+    # Off-screen rendering with Agg, images whose inputs did not change are copied from the cache
+    os.makedirs(out_dir, exist_ok=True)
+    os.makedirs(cache_dir, exist_ok=True)
+    plt = None
+    outputs = []
+    params = {'format': fmt, 'dpi': dpi, 'density': density}
+    for plot_name, plot_fun in (DENSITY_PLOTS if density else PLOTS).items():
+        cached = os.path.join(cache_dir, f'{plot_key(classes, plot_name, params)}.{fmt}')
+        if not os.path.exists(cached):
+            if plt is None:
+                plt = load_pyplot('Agg')
+            load_classes(classes, density)
+            fig = plot_fun(plt, classes)
+            fig.savefig(cached + '.tmp', format=fmt, dpi=dpi)
+            plt.close(fig)
+            os.replace(cached + '.tmp', cached)
+        output = os.path.join(out_dir, f'{plot_name}.{fmt}')
+        shutil.copyfile(cached, output)
+        outputs.append(output)
+    return outputs
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Plot class scores')
+    parser.add_argument('--save', metavar='DIR', help='write the plots to DIR instead of showing them')
+    parser.add_argument('--format', default='png', choices=['png', 'svg'])
+    parser.add_argument('--cache-dir', default='.plot_cache')
+    parser.add_argument('--density', action='store_true', help='bin the scores instead of drawing every student')
+    args = parser.parse_args()
+
+    classes = [dict(c) for c in CLASSES]
+    if args.save:
+        for output in save_plots(classes, args.save, args.format, cache_dir=args.cache_dir, density=args.density):
+            print(output)
+    else:
+        # Load score data
+        load_classes(classes, args.density)
+        plt = load_pyplot('TKAgg')
+        plots = DENSITY_PLOTS if args.density else PLOTS
+
+        # Plot midterm/final scores as points
+        plots['scatter'](plt, classes)
+        plt.show()
+
+        # Plot total scores as a histogram
+        plots['hist'](plt, classes)
+        plt.show()
@@ -1,41 +1,152 @@
+import argparse
+import json
+import os
 import numpy as np
-import matplotlib
-import matplotlib.pyplot as plt
 
-matplotlib.use('TKAgg')
+
+def file_source(filename):
+    # Identifies a data file and its version, a refit is needed when it changes
+    stat = os.stat(filename)
+    return [os.path.abspath(filename), stat.st_mtime_ns, stat.st_size]
+
+
+class OnlineLinearRegression:
+    # Least squares from running sums (A^T A, A^T b, b^T b) of the rows A = [x, 1], no raw data is kept
+    def __init__(self, n_features=1):
+        self.n = 0
+        self.AtA = np.zeros((n_features + 1, n_features + 1))
+        self.Atb = np.zeros(n_features + 1)
+        self.btb = 0.
+        self.sources = []  # 'file_source' of every file in the sums
+        self._coeff = None
+
+    @classmethod
+    def from_file(cls, filename):
+        data = np.loadtxt(filename, delimiter=',', ndmin=2)
+        model = cls(data.shape[1] - 1).add_many(data[:, :-1], data[:, -1])
+        model.sources = [file_source(filename)]
+        return model
+
+    @classmethod
+    def load(cls, filename):
+        with np.load(filename) as saved:
+            model = cls(len(saved['Atb']) - 1)
+            model.n, model.AtA, model.Atb, model.btb = int(saved['n']), saved['AtA'], saved['Atb'], float(saved['btb'])
+            model.sources = json.loads(str(saved['sources'])) if 'sources' in saved else []
+        return model
+
+    def save(self, filename):
+        with open(filename, 'wb') as f:  # 'np.savez' would append '.npz' to a name without it
+            np.savez(f, n=self.n, AtA=self.AtA, Atb=self.Atb, btb=self.btb, sources=json.dumps(self.sources))
+
+    def add(self, x, y, weight=1):
+        # One observation in O(1), a negative 'weight' removes it again
+        row = np.append(x, 1.)
+        self.AtA += weight * np.outer(row, row)
+        self.Atb += weight * y * row
+        self.btb += weight * y * y
+        self.n += weight
+        self._coeff = None
+        return self
+
+    def remove(self, x, y):
+        return self.add(x, y, -1)
+
+    def add_many(self, xs, ys):
+        A = np.column_stack((np.reshape(xs, (len(ys), -1)), np.ones(len(ys))))
+        self.AtA += A.T @ A
+        self.Atb += A.T @ ys
+        self.btb += ys @ ys
+        self.n += len(ys)
+        self._coeff = None
+        return self
+
+    def merge(self, other):
+        self.AtA += other.AtA
+        self.Atb += other.Atb
+        self.btb += other.btb
+        self.n += other.n
+        self.sources = self.sources + other.sources
+        self._coeff = None
+        return self
+
+    def __add__(self, other):
+        model = OnlineLinearRegression(len(self.Atb) - 1).merge(self)
+        return model.merge(other)
+
+    @property
+    def coeff(self):
+        # [slopes..., y_intercept], solved again only after the sums changed
+        if self._coeff is None:
+            self._coeff = np.linalg.lstsq(self.AtA, self.Atb, rcond=None)[0]
+        return self._coeff
+
+    def rss(self):
+        coeff = self.coeff
+        return self.btb - 2 * coeff @ self.Atb + coeff @ self.AtA @ coeff
+
+    def predict(self, xs):
+        xs = np.asarray(xs, dtype=float)
+        if len(self.coeff) == 2:
+            return self.coeff[0] * xs + self.coeff[1]
+        return xs @ self.coeff[:-1] + self.coeff[-1]
+
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Predict final scores from midterm scores')
+    parser.add_argument('files', nargs='*', default=['data/class_score_kr.csv', 'data/class_score_en.csv'])
+    parser.add_argument('--model', default='data/class_score_model.npz', help='the saved model, built from the files if missing')
+    parser.add_argument('--refit', action='store_true', help='build the model from the files again')
+    parser.add_argument('--no-plot', action='store_true')
+    args = parser.parse_args()
+
     midterm_range = np.array([0, 125])
     final_range = np.array([0, 100])
 
-    # Load score data
-    class_kr = np.loadtxt('data/class_score_kr.csv', delimiter=',')
-    class_en = np.loadtxt('data/class_score_en.csv', delimiter=',')
-    data = np.vstack((class_kr, class_en))
-    x = data[:, 0]  # y = wx + b
-    y = data[:, 1]
-
-    A = np.vstack((x, np.ones(x.shape))).T
-
     # Estimate a line, final = slope * midterm + y_intercept
-    line = np.linalg.pinv(A) @ y # TODO: Please find the best [slope, y_intercept] from 'data'
+    # The saved model is used only if it was built from the same versions of the same files
+    model = None
+    if os.path.exists(args.model) and not args.refit:
+        model = OnlineLinearRegression.load(args.model)
+        if model.sources != [file_source(filename) for filename in args.files]:
+            print(f'{args.model} was built from other or changed files, refitting (added scores are dropped)')
+            model = None
+    if model is None:
+        model = sum((OnlineLinearRegression.from_file(filename) for filename in args.files), OnlineLinearRegression())
+        model.save(args.model)
+    print(f'Model: final = {model.coeff[0]:.3f} * midterm + {model.coeff[1]:.3f} ({model.n} students)')
 
-    # Predict scores
-    final = lambda midterm: line[0] * midterm + line[1]
+    # Predict scores, 'midterm,final' adds a new student to the model
+    added = []
     while True:
-        given = input('Q) Please input your midterm score (Enter or -1: exit)? ')
-        if given == '' or float(given) < 0:
+        given = input('Q) Please input your midterm score (Enter or -1: exit, "midterm,final": add a score)? ')
+        if given == '' or float(given.split(',')[0]) < 0:
             break
-        print(f'A) Your final score is expected to {final(float(given)):.3f}.')
-
-    # Plot scores and the estimated line
-    plt.figure()
-    plt.plot(data[:,0], data[:,1], 'r.', label='The given data')
-    plt.plot(midterm_range, final(midterm_range), 'b-', label='Prediction')
-    plt.xlabel('Midterm scores')
-    plt.ylabel('Final scores')
-    plt.xlim(midterm_range)
-    plt.ylim(final_range)
-    plt.grid()
-    plt.legend()
-    plt.show()
\ No newline at end of file
+        if ',' in given:
+            midterm, final = (float(word) for word in given.split(','))
+            model.add(midterm, final)
+            model.save(args.model)
+            added.append((midterm, final))
+            print(f'A) Added, final = {model.coeff[0]:.3f} * midterm + {model.coeff[1]:.3f} ({model.n} students)')
+        else:
+            print(f'A) Your final score is expected to {model.predict(float(given)):.3f}.')
+
+    if not args.no_plot:
+        # matplotlib and the raw data are loaded only for the plot
+        import matplotlib
+        matplotlib.use('TKAgg')
+        import matplotlib.pyplot as plt
+
+        data = np.vstack([np.loadtxt(filename, delimiter=',', ndmin=2) for filename in args.files] + [np.reshape(added, (-1, 2))])
+
+        # Plot scores and the estimated line
+        plt.figure()
+        plt.plot(data[:,0], data[:,1], 'r.', label='The given data')
+        plt.plot(midterm_range, model.predict(midterm_range), 'b-', label='Prediction')
+        plt.xlabel('Midterm scores')
+        plt.ylabel('Final scores')
+        plt.xlim(midterm_range)
+        plt.ylim(final_range)
+        plt.grid()
+        plt.legend()
+        plt.show()
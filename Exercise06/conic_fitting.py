@@ -1,11 +1,9 @@
 import numpy as np
 import matplotlib.pyplot as plt
+from poly_fitting import build_design, solve_qr, eval_poly
 
 def buildA(order, xs):
-    A = np.empty((0, len(xs)))
-    for i in range(order + 1):
-        A = np.vstack((xs**i, A))
-    return A.T
+    return build_design(xs, order)
 
 true_coeff = [0.1, -0.8, -1.5, 5.4]
 poly_order = 3 # Try other integer (>= 0)
@@ -24,14 +22,14 @@ yn = y + np.random.normal(scale=noise_std, size=y.shape)
 # Solve the system of equations
 A = buildA(poly_order, xn)
 b = yn
-coeff = np.linalg.pinv(A) @ b
+coeff = solve_qr(A, b)
 
 # Plot the data and result
 plt.title(f'Order: {poly_order}, Coeff: ' + np.array2string(coeff, precision=2, suppress_small=True))
 xc = np.linspace(*data_range, 100)
-plt.plot(xc, np.matmul(buildA(len(true_coeff) - 1, xc), true_coeff), 'k-', label='The true curve', alpha=0.2)
+plt.plot(xc, eval_poly(true_coeff, xc), 'k-', label='The true curve', alpha=0.2)
 plt.plot(xn, yn, 'b.', label='Noisy data')
-plt.plot(xc, np.matmul(buildA(poly_order, xc), coeff), 'g-', label='Estimate')
+plt.plot(xc, eval_poly(coeff, xc), 'g-', label='Estimate')
 plt.xlim(data_range)
 plt.legend()
 plt.show()
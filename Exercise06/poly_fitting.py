@@ -0,0 +1,198 @@
+import numpy as np
+
+BASES = ['power', 'chebyshev', 'legendre']
+
+
+def to_unit(xs, domain):
+    # Map 'domain' to [-1, 1] where the orthogonal bases are well conditioned
+    lo, hi = domain
+    return (2 * np.asarray(xs, dtype=float) - (lo + hi)) / (hi - lo)
+
+
+def build_design(xs, order, basis='power', out=None):
+    # The design matrix with the highest order first, e.g. [x^3, x^2, x, 1] like 'np.polyval'
+    # 'xs' can be stacked (..., n), then the result is (..., n, order + 1)
+    xs = np.asarray(xs, dtype=float)
+    if out is None:
+        out = np.empty(xs.shape + (order + 1,))
+    out[..., order] = 1
+    if order > 0:
+        out[..., order - 1] = xs
+    for k in range(1, order):
+        # Each column from the previous one or two, no power is computed from scratch
+        p_prev, p_curr, p_next = out[..., order - k + 1], out[..., order - k], out[..., order - k - 1]
+        if basis == 'power':
+            np.multiply(p_curr, xs, out=p_next)
+        elif basis == 'chebyshev':
+            np.multiply(p_curr, 2 * xs, out=p_next)
+            p_next -= p_prev
+        elif basis == 'legendre':
+            np.multiply(p_curr, (2 * k + 1) / (k + 1) * xs, out=p_next)
+            p_next -= k / (k + 1) * p_prev
+        else:
+            raise ValueError(f'Unknown basis {basis}, must be one of {BASES}')
+    return out
+
+
+def solve_qr(A, b):
+    # Least squares with a (batched) QR decomposition instead of the SVD in 'np.linalg.pinv'
+    Q, R = np.linalg.qr(A)
+    return np.linalg.solve(R, (np.swapaxes(Q, -1, -2) @ b[..., None]))[..., 0]
+
+
+def solve_lstsq(A, b):
+    # 'np.linalg.lstsq' is not batched, a stack of systems is solved one by one
+    if A.ndim > 2:
+        As, bs = A.reshape(-1, *A.shape[-2:]), b.reshape(-1, b.shape[-1])
+        coeff = [np.linalg.lstsq(a, y, rcond=None)[0] for a, y in zip(As, bs)]
+        return np.stack(coeff).reshape(*A.shape[:-2], -1)
+    return np.linalg.lstsq(A, b, rcond=None)[0]
+
+
+SOLVERS = {'qr': solve_qr, 'lstsq': solve_lstsq}
+
+
+def eval_poly(coeff, xs, basis='power', out=None):
+    # Horner (power) or Clenshaw (orthogonal bases) evaluation, writing into 'out'
+    # 'coeff' (..., order + 1) is broadcast against 'xs' (..., n)
+    coeff = np.asarray(coeff, dtype=float)
+    xs = np.asarray(xs, dtype=float)
+    shape = np.broadcast_shapes(coeff.shape[:-1] + (1,), xs.shape)
+    if out is None:
+        out = np.empty(shape)
+    order = coeff.shape[-1] - 1
+    if basis == 'power':
+        out[...] = coeff[..., :1]
+        for k in range(1, order + 1):
+            out *= xs
+            out += coeff[..., k:k + 1]
+        return out
+    if basis not in BASES:
+        raise ValueError(f'Unknown basis {basis}, must be one of {BASES}')
+
+    # b_k = c_k + alpha_k(x) * b_(k+1) + beta_(k+1) * b_(k+2), from the highest order down
+    b1, b2 = np.zeros(shape), np.zeros(shape)
+    tmp = np.empty(shape)
+    for k in range(order, 0, -1):
+        if basis == 'chebyshev':
+            alpha, beta = 2, -1
+        else:
+            alpha, beta = (2 * k + 1) / (k + 1), -(k + 1) / (k + 2)
+        np.multiply(b1, alpha * xs, out=tmp)
+        tmp += beta * b2
+        tmp += coeff[..., order - k:order - k + 1]
+        b1, b2, tmp = tmp, b1, b2
+    beta = -1 if basis == 'chebyshev' else -0.5
+    np.multiply(b1, xs, out=out)
+    out += beta * b2
+    out += coeff[..., order:]
+    return out
+
+
+def group_index(group_ids):
+    # Labels of the groups and the index of every row's group, rows sorted by group
+    labels, index = np.unique(group_ids, return_inverse=True)
+    order = np.argsort(index, kind='stable')
+    starts = np.searchsorted(index[order], np.arange(len(labels)))
+    return labels, index, order, starts
+
+
+def fit_padded_qr(A, b):
+    # Least squares of a stack of systems, 'A' (m, n, k) and 'b' (m, n), with one batched QR
+    n_rows, k = A.shape[-2:]
+    Q, R = np.linalg.qr(A)
+
+    # A tiny diagonal of R means rank-deficient rows (e.g. one repeated x), as in 'np.linalg.matrix_rank'
+    diag = np.abs(np.diagonal(R, axis1=-2, axis2=-1))
+    full = diag.min(axis=-1) > diag.max(axis=-1, initial=0) * max(n_rows, k) * np.finfo(float).eps
+    coeff = np.empty((len(A), k))
+    Qtb = np.swapaxes(Q[full], -1, -2) @ b[full, :, None]
+    coeff[full] = np.linalg.solve(R[full], Qtb)[..., 0]
+    coeff[~full] = (np.linalg.pinv(A[~full]) @ b[~full, :, None])[..., 0]
+    return coeff
+
+
+def fit_groups(A, b, group_ids, method='normal'):
+    # Least squares of every group of rows in one call, 'A' (n, k), 'b' (n,) and 'group_ids' (n,)
+    # Returns the group labels, coefficients (n_groups, k), residual sum of squares and group sizes
+    A, b = np.asarray(A, dtype=float), np.asarray(b, dtype=float)
+    labels, index, order, starts = group_index(group_ids)
+    sizes = np.diff(np.append(starts, len(b)))
+    n_groups, k = len(labels), A.shape[1]
+    if method == 'normal':
+        # Sums of the outer products per group, i.e. stacked A^T A and A^T b
+        As, bs = A[order], b[order]
+        AtA = np.add.reduceat(As[:, :, None] * As[:, None, :], starts, axis=0)
+        Atb = np.add.reduceat(As * bs[:, None], starts, axis=0)
+        full = np.linalg.matrix_rank(AtA) == k
+        coeff = np.empty((n_groups, k))
+        coeff[full] = np.linalg.solve(AtA[full], Atb[full, :, None])[..., 0]
+        coeff[~full] = (np.linalg.pinv(AtA[~full]) @ Atb[~full, :, None])[..., 0]
+    elif method == 'qr':
+        # Groups are padded with zero rows, which do not change the solution, to the next power of two
+        # and solved as one batch per padded size, so the padding at most doubles the rows of a group
+        coeff = np.empty((n_groups, k))
+        padded = np.maximum(2**np.ceil(np.log2(np.maximum(sizes, 1))).astype(int), k)
+        group = index[order]
+        pos = np.arange(len(b)) - starts[group]
+        slot = np.empty(n_groups, dtype=int)
+        for n_rows in np.unique(padded):
+            groups = np.flatnonzero(padded == n_rows)
+            slot[groups] = np.arange(len(groups))
+            rows = padded[group] == n_rows
+            A_pad, b_pad = np.zeros((len(groups), n_rows, k)), np.zeros((len(groups), n_rows))
+            A_pad[slot[group[rows]], pos[rows]] = A[order[rows]]
+            b_pad[slot[group[rows]], pos[rows]] = b[order[rows]]
+            coeff[groups] = fit_padded_qr(A_pad, b_pad)
+    else:
+        raise ValueError(f'Unknown method {method}, must be normal or qr')
+    residual = b - np.einsum('ij,ij->i', A, coeff[index])
+    rss = np.bincount(index, weights=residual**2, minlength=n_groups)
+    return labels, coeff, rss, sizes
+
+
+class PolyFit:
+    # A fitted polynomial (or a stack of them), callable like a function
+    def __init__(self, coeff, basis='power', domain=None):
+        self.coeff = coeff
+        self.basis = basis
+        self.domain = domain
+
+    @classmethod
+    def fit(cls, xs, ys, order, basis='power', method='qr', domain=None):
+        xs = np.asarray(xs, dtype=float)
+        if basis != 'power':
+            if domain is None:
+                domain = (xs.min(axis=-1, keepdims=True), xs.max(axis=-1, keepdims=True))
+            xs = to_unit(xs, domain)
+        A = build_design(xs, order, basis)
+        return cls(SOLVERS[method](A, np.asarray(ys, dtype=float)), basis, domain)
+
+    def __call__(self, xs, out=None):
+        if self.basis != 'power':
+            xs = to_unit(xs, self.domain)
+        return eval_poly(self.coeff, xs, self.basis, out)
+
+
+if __name__ == '__main__':
+    # Compare the bases on a high order fit of many series at once
+    import time
+    rng = np.random.default_rng(0)
+    n_series, n_data, order = 1000, 200, 12
+    xs = rng.uniform(-6, 12, size=(n_series, n_data))
+    ys = np.sin(xs / 2) + rng.normal(scale=0.1, size=xs.shape)
+    for basis in BASES:
+        start = time.perf_counter()
+        model = PolyFit.fit(xs, ys, order, basis)
+        rmse = np.sqrt(np.mean((model(xs) - ys)**2))
+        print(f'{basis:>10}: RMSE {rmse:.4f}, {time.perf_counter() - start:.3f} s')
+
+    # Lines of many ragged groups, e.g. per class or per region
+    group_ids = rng.integers(0, 5000, size=200000)
+    xs = rng.uniform(0, 10, size=group_ids.shape)
+    ys = rng.normal(size=5000)[group_ids] * xs + rng.normal(scale=0.1, size=xs.shape)
+    for method in ['normal', 'qr']:
+        start = time.perf_counter()
+        labels, coeff, rss, sizes = fit_groups(build_design(xs, 1), ys, group_ids, method)
+        print(f'{method:>10}: {len(labels)} groups, RMSE {np.sqrt(rss.sum() / sizes.sum()):.4f}, '
+              f'{time.perf_counter() - start:.3f} s')
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+
+def upsample(values, factor):
+    # Bilinear interpolation of a (n, m) grid to ((n - 1) * factor + 1, (m - 1) * factor + 1) points
+    for axis in range(2):
+        n = values.shape[axis]
+        t = np.linspace(0, n - 1, (n - 1) * factor + 1)
+        i0 = np.minimum(np.floor(t).astype(int), n - 2)
+        w = t - i0
+        w = w[:, None] if axis == 0 else w
+        values = np.take(values, i0, axis=axis) * (1 - w) + np.take(values, i0 + 1, axis=axis) * w
+    return values
+
+
+class Landscape:
+    # Values of f((xx, yy)) on square tiles of a fixed world grid, each tile is refined until its linear
+    # interpolation error is within 'tol' of the value range, tiles are cached in memory and on disk
+    # With 'log_scale' the error is measured on log(1 + f - min f), so a shallow valley needs as fine a grid as a steep wall
+    def __init__(self, fun, fun_key, tile_size=0.5, base_n=9, max_level=3, tol=0.02, log_scale=True,
+                 cache_dir='.landscape_cache'):
+        if base_n < 3 or base_n % 2 == 0:
+            raise ValueError(f'base_n must be an odd number >= 3, not {base_n}')
+        self.fun = fun
+        self.fun_key = fun_key  # e.g. 'symbolic_compile.expression_key' of the function
+        self.tile_size = tile_size
+        self.base_n = base_n
+        self.max_level = max_level
+        self.tol = tol
+        self.log_scale = log_scale
+        self.cache_dir = cache_dir
+        self.tiles = {}
+        self.n_evals = 0  # Points evaluated by 'fun' (not from a cache)
+
+    def tile_key(self, ix, iy, level):
+        key = [self.fun_key, self.tile_size, self.base_n, ix, iy, level]
+        return hashlib.sha256(json.dumps(key).encode()).hexdigest()
+
+    def tile(self, ix, iy, level):
+        # (n, n) values of a tile including its edges, n = (base_n - 1) * 2^level + 1
+        if (ix, iy, level) in self.tiles:
+            return self.tiles[ix, iy, level]
+        cached = os.path.join(self.cache_dir, f'{self.tile_key(ix, iy, level)}.npy') if self.cache_dir else None
+        if cached and os.path.exists(cached):
+            values = np.load(cached)
+        else:
+            n = (self.base_n - 1) * 2**level + 1
+            xs = (ix + np.linspace(0, 1, n)) * self.tile_size
+            ys = (iy + np.linspace(0, 1, n)) * self.tile_size
+            xx, yy = np.meshgrid(xs, ys)
+            values = np.empty((n, n))
+            new = np.ones((n, n), dtype=bool)
+            if level > 0:
+                # Every other point is a point of the previous level, only the others are evaluated
+                values[::2, ::2] = self.tile(ix, iy, level - 1)
+                new[::2, ::2] = False
+            values[new] = self.fun((xx[new], yy[new]))
+            self.n_evals += int(new.sum())
+            if cached:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                np.save(cached + '.tmp.npy', values)
+                os.replace(cached + '.tmp.npy', cached)
+        self.tiles[ix, iy, level] = values
+        return values
+
+    def scaled(self, values, z_min):
+        return np.log1p(np.maximum(values - z_min, 0)) if self.log_scale else values
+
+    def refine(self, ix, iy, z_min, scale):
+        # The first level whose estimated interpolation error is at most 'tol * scale', and its values
+        # The error of a level is about 1/4 of the error of interpolating it from its every other point
+        for level in range(self.max_level + 1):
+            values = self.tile(ix, iy, level)
+            z = self.scaled(values, z_min)
+            error = np.max(np.abs(z - upsample(z[::2, ::2], 2))) / 4
+            if error <= self.tol * scale:
+                break
+        return level, values
+
+    def grid(self, x_range, y_range):
+        # xx, yy, zz for 'contourf' over all tiles which overlap the ranges, at the finest level used
+        ixs = range(int(np.floor(x_range[0] / self.tile_size)), int(np.ceil(x_range[1] / self.tile_size)))
+        iys = range(int(np.floor(y_range[0] / self.tile_size)), int(np.ceil(y_range[1] / self.tile_size)))
+        coarse = np.array([[self.tile(ix, iy, 0) for ix in ixs] for iy in iys])
+        coarse = coarse[np.isfinite(coarse)]
+        z_min = coarse.min()
+        scale = np.ptp(self.scaled(coarse, z_min)) or 1.
+        refined = [[self.refine(ix, iy, z_min, scale) for ix in ixs] for iy in iys]
+        top = max(level for row in refined for level, _ in row)
+        self.levels = np.array([[level for level, _ in row] for row in refined])
+
+        # Tiles share their edges, so the first row and column of all but the first tiles are dropped
+        rows = []
+        for r, row in enumerate(refined):
+            tiles = [upsample(values, 2**(top - level)) for level, values in row]
+            tiles = [tiles[0]] + [t[:, 1:] for t in tiles[1:]]
+            rows.append(np.hstack(tiles) if r == 0 else np.hstack(tiles)[1:])
+        zz = np.vstack(rows)
+        n = (self.base_n - 1) * 2**top
+        xs = ixs[0] * self.tile_size + np.arange(zz.shape[1]) * self.tile_size / n
+        ys = iys[0] * self.tile_size + np.arange(zz.shape[0]) * self.tile_size / n
+        xx, yy = np.meshgrid(xs, ys)
+        return xx, yy, zz
@@ -1,47 +1,99 @@
+import argparse
 import numpy as np
-from scipy.optimize import minimize
-import matplotlib
-import matplotlib.pyplot as plt
-matplotlib.use('TKAgg')
+import optimizers
+import symbolic_compile
+from landscape import Landscape
+
+# Define a cost function, its gradient and Hessian are derived symbolically (and cached in '.sym_cache')
+# They work on (2, N) batches of points, and can be sent to other processes
+str_fun = "(1 - x_0)**2 + 100*(x_1 - x_0**2)**2"
+
+
+def load_pyplot(save):
+    # matplotlib is imported only for a plot, None if no window can be opened
+    import matplotlib.pyplot as plt
+    try:
+        plt.switch_backend('Agg' if save else 'TKAgg')
+    except ImportError as ex:
+        print(f'Cannot show the plot ({ex}), please use --save FILE or --no-plot')
+        return None
+    return plt
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description='Minimize a function of two variables')
+    parser.add_argument('--fun', default=str_fun, help='the cost function of x_0 and x_1')
+    parser.add_argument('--method', default='gd', choices=list(optimizers.METHODS))
+    parser.add_argument('--x-init', type=float, nargs=2, default=[-1, 1])   # Please try other initial points
+    parser.add_argument('--learn-rate', type=float, default=0.001)          # Please try 0.01, 0.005, and 0.0001
+    parser.add_argument('--max-iter', type=int, default=10000)              # Please try 100, 1000, and 100000
+    parser.add_argument('--tol', type=float, default=1e-6)
+    parser.add_argument('--starts', type=int, default=0, help='random initial points of a multi-start sweep, e.g. 1000')
+    parser.add_argument('--no-scipy', action='store_true', help='skip the SciPy comparisons')
+    parser.add_argument('--save', metavar='FILE', help='write the plot to FILE instead of showing it')
+    parser.add_argument('--no-plot', action='store_true', help='print the results only')
+    parser.add_argument('--landscape-cache', default='.landscape_cache', help='the cache of evaluated contour tiles')
+    return parser
 
-if __name__ == '__main__':
-    # Define a cost function and its gradient
-    f   = lambda x: (1 - x[0])**2 + 100*(x[1] - x[0]**2)**2
-    fd  = lambda x: np.array([-400*x[0]*(-x[0]**2 + x[1]) + 2*x[0] - 2, -200*x[0]**2 + 200*x[1]])  # TODO: Fill the gradient vector as [df / dx[0], df / dy[1]]
 
-    # Define configuration
-    x_init = [-1, 1]   # Please try other initial points
-    learn_rate = 0.001 # Please try 0.01, 0.005, and 0.0001
-    max_iter = 10000   # Please try 100, 1000, and 100000
-    min_tol = 1e-6
+def run(args):
+    sym_fun = symbolic_compile.compile_function(args.fun)
+    f, fd, fdd = sym_fun.f, sym_fun.fd, sym_fun.fdd
+    x_init, max_iter, min_tol = args.x_init, args.max_iter, args.tol
 
     # Optimize the cost function using my gradient descent
-    x = np.array(x_init)
-    gd_xs = [x]
-    for i in range(max_iter):
-        # Run the gradient descent
-        xp = x
-        x = x - learn_rate*fd(x)# TODO: Implement your gradient descent
-        gd_xs.append(x)
-
-        # Check the terminal condition
-        if np.linalg.norm(x - xp) < min_tol:
-            break
-    gd_xs = np.array(gd_xs)
+    method = args.method
+    options = {'learn_rate': args.learn_rate} if method in ['gd', 'momentum', 'nesterov'] else {}
+    options = {'hess': fdd} if method == 'newton' else options
+    gd = optimizers.minimize(f, x_init, fd, method, tol=min_tol, max_iter=max_iter, **options)
+    gd_xs = gd.xs
+    print(f'{method}: x={np.array2string(gd.x, precision=4)}, f={gd.fun:.3g}, iter={gd.nit}')
+
+    # Compare the cost of all methods
+    for name in optimizers.METHODS:
+        res = optimizers.minimize(f, x_init, fd, name, tol=min_tol, max_iter=max_iter, record=False,
+                                  **({'hess': fdd} if name == 'newton' else {}))
+        print(f'{name:>8}: f={res.fun:.3g}, iter={res.nit}, f evals={res.nfev}, fd evals={res.njev}, time={1000 * res.time:.1f} ms')
 
     # Optimize the cost function using SciPy
-    result = minimize(f, x_init, tol=min_tol, options={'maxiter': max_iter, 'return_all': True})
-    sp_xs = np.array(result.allvecs)
+    sp_xs = None
+    if not args.no_scipy:
+        from scipy.optimize import minimize
+        result = minimize(f, x_init, tol=min_tol, options={'maxiter': max_iter, 'return_all': True})
+        sp_xs = np.array(result.allvecs)
+        print(f'   SciPy: f={result.fun:.3g}, iter={result.nit}, f evals={result.nfev}')
+
+    # Optimize from many random initial points at once
+    n_starts = args.starts
+    if n_starts > 0:
+        starts = np.random.uniform([-2, -1], [2, 3], size=(n_starts, 2))
+        runs = [('Batched GD', optimizers.minimize_batch(f, starts, fd, learn_rate=args.learn_rate, tol=min_tol, max_iter=max_iter))]
+        if not args.no_scipy:
+            runs.append(('SciPy BFGS', optimizers.minimize_many(f, starts, fd, method='BFGS', tol=min_tol)))
+        for name, batch in runs:
+            with np.errstate(invalid='ignore'):
+                best = batch.x[np.nanargmin(batch.fun)]
+                n_best = np.sum(np.linalg.norm(batch.x - best, axis=1) < 0.01)
+            print(f'{name}: {batch.success.sum()}/{n_starts} converged, {n_best} near {np.array2string(best, precision=3)}, time={batch.time:.2f} s')
 
     # Visualize the results
-    x_range = np.linspace(-2, 2, 100)
-    y_range = np.linspace(-1, 3, 100)
-    xx, yy = np.meshgrid(x_range, y_range)
-    zz = f((xx, yy))
+    plt = None if args.no_plot else load_pyplot(args.save)
+    if plt is None:
+        return
+    landscape = Landscape(f, symbolic_compile.expression_key(args.fun, None), cache_dir=args.landscape_cache)
+    xx, yy, zz = landscape.grid((-2, 2), (-1, 3))
     plt.contourf(xx, yy, zz)
-    plt.plot(gd_xs[:,0], gd_xs[:,1], 'r.', label=f'GD (iter={len(gd_xs)})')
-    plt.plot(sp_xs[:,0], sp_xs[:,1], 'b.', label=f'SciPy (iter={result.nit})')
+    plt.plot(gd_xs[:,0], gd_xs[:,1], 'r.', label=f'{method} (iter={gd.nit})')
+    if sp_xs is not None:
+        plt.plot(sp_xs[:,0], sp_xs[:,1], 'b.', label=f'SciPy (iter={result.nit})')
     plt.xlabel('$x_0$')
     plt.ylabel('$x_1$')
     plt.legend()
-    plt.show()
\ No newline at end of file
+    if args.save:
+        plt.savefig(args.save)
+    else:
+        plt.show()
+
+
+if __name__ == '__main__':
+    run(build_parser().parse_args())
@@ -0,0 +1,53 @@
+import argparse
+import subprocess
+import sys
+import time
+
+# Heavy dependencies are imported by the subcommands which need them, never at startup
+DEPENDENCIES = ['numpy', 'scipy.optimize', 'sympy', 'matplotlib.pyplot', 'IPython']
+TOOL_MODULES = ['symbolic_compile', 'optimizers', 'multivar_optimization', 'symbolic_fun']
+
+
+def import_time(module):
+    # Seconds to import 'module' in a fresh interpreter, None if it is not installed
+    code = f'import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)'
+    proc = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    return float(proc.stdout) if proc.returncode == 0 else None
+
+
+def profile_imports(modules):
+    print(f'{"Module":<24} {"Import time":>12}')
+    for module in modules:
+        seconds = import_time(module)
+        print(f'{module:<24} {"not installed" if seconds is None else f"{1000 * seconds:9.1f} ms":>12}')
+
+
+def main(argv=None):
+    start = time.perf_counter()
+    parser = argparse.ArgumentParser(description='Symbolic derivatives and optimization of cost functions')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    symbolic = commands.add_parser('symbolic', help='show the gradient and Hessian of a function')
+    symbolic.add_argument('fun', nargs='?', default=None)
+
+    optimize = commands.add_parser('optimize', help='minimize a function and compare the methods')
+    import multivar_optimization  # Light, NumPy only until a subcommand runs
+    multivar_optimization.build_parser(optimize)
+
+    profile = commands.add_parser('profile', help='report the import time of every dependency')
+    profile.add_argument('--tool', action='store_true', help='profile the modules of this tool instead')
+
+    args = parser.parse_args(argv)
+    if args.command == 'symbolic':
+        import symbolic_fun
+        symbolic_fun.show_derivatives(args.fun or symbolic_fun.str_fun)
+    elif args.command == 'optimize':
+        multivar_optimization.run(args)
+    else:
+        print(f'Startup of this tool: {1000 * (time.perf_counter() - start):.1f} ms, loaded: '
+              + ', '.join(module for module in DEPENDENCIES if module in sys.modules))
+        profile_imports(TOOL_MODULES if args.tool else DEPENDENCIES)
+
+
+if __name__ == '__main__':
+    main()
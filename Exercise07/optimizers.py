@@ -0,0 +1,297 @@
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+
+class Problem:
+    # A cost function and its gradient which count their evaluations
+    def __init__(self, fun, jac):
+        self.fun = fun
+        self.jac = jac
+        self.nfev = 0
+        self.njev = 0
+
+    def f(self, x):
+        self.nfev += 1
+        return self.fun(x)
+
+    def fd(self, x):
+        self.njev += 1
+        return np.asarray(self.jac(x), dtype=float)
+
+
+def armijo(problem, x, fx, g, direction, step=1., shrink=0.5, c=1e-4, max_shrink=60):
+    # Backtracking until the sufficient decrease condition holds, returns the step and f at the new point
+    slope = c * (g @ direction)
+    for _ in range(max_shrink):
+        f_new = problem.f(x + step * direction)
+        if f_new <= fx + step * slope:
+            break
+        step *= shrink
+    return step, f_new
+
+
+def wolfe(problem, x, fx, g, direction, c1=1e-4, c2=0.9, max_trials=60):
+    # Bisection and doubling until the weak Wolfe conditions hold, returns the step, f and the gradient there
+    slope = g @ direction
+    lo, hi, step = 0., np.inf, 1.
+    for _ in range(max_trials):
+        x_new = x + step * direction
+        f_new = problem.f(x_new)
+        if f_new > fx + c1 * step * slope:
+            hi = step
+        else:
+            g_new = problem.fd(x_new)
+            if g_new @ direction >= c2 * slope:
+                return step, f_new, g_new
+            lo = step
+        step = (lo + hi) / 2 if hi < np.inf else 2 * lo
+    return step, problem.f(x + step * direction), problem.fd(x + step * direction)
+
+
+class GradientDescent:
+    def __init__(self, learn_rate=0.001):
+        self.learn_rate = learn_rate
+
+    def start(self, problem, x):
+        pass
+
+    def step(self, problem, x):
+        return x - self.learn_rate * problem.fd(x)
+
+
+class Momentum:
+    def __init__(self, learn_rate=0.001, beta=0.9, nesterov=False):
+        self.learn_rate = learn_rate
+        self.beta = beta
+        self.nesterov = nesterov
+
+    def start(self, problem, x):
+        self.v = np.zeros_like(x)
+
+    def step(self, problem, x):
+        # Nesterov takes the gradient where the velocity is going to carry 'x'
+        g = problem.fd(x + self.beta * self.v if self.nesterov else x)
+        self.v *= self.beta
+        self.v -= self.learn_rate * g
+        return x + self.v
+
+
+class Nesterov(Momentum):
+    def __init__(self, learn_rate=0.001, beta=0.9):
+        super().__init__(learn_rate, beta, nesterov=True)
+
+
+class Adam:
+    def __init__(self, learn_rate=0.01, beta1=0.9, beta2=0.999, eps=1e-8):
+        self.learn_rate = learn_rate
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.eps = eps
+
+    def start(self, problem, x):
+        self.m = np.zeros_like(x)
+        self.v = np.zeros_like(x)
+        self.t = 0
+
+    def step(self, problem, x):
+        g = problem.fd(x)
+        self.t += 1
+        self.m = self.beta1 * self.m + (1 - self.beta1) * g
+        self.v = self.beta2 * self.v + (1 - self.beta2) * g * g
+        m_hat = self.m / (1 - self.beta1**self.t)
+        v_hat = self.v / (1 - self.beta2**self.t)
+        return x - self.learn_rate * m_hat / (np.sqrt(v_hat) + self.eps)
+
+
+class ArmijoDescent:
+    # Steepest descent with a backtracking line search, the first trial step grows after a success
+    def __init__(self, step=1., shrink=0.5, c=1e-4):
+        self.step0 = step
+        self.shrink = shrink
+        self.c = c
+
+    def start(self, problem, x):
+        self.fx = problem.f(x)
+        self.step_size = self.step0
+
+    def step(self, problem, x):
+        g = problem.fd(x)
+        self.step_size, self.fx = armijo(problem, x, self.fx, g, -g, 2 * self.step_size, self.shrink, self.c)
+        return x - self.step_size * g
+
+
+class LBFGS:
+    # Limited-memory BFGS with the two-loop recursion and a Wolfe line search
+    def __init__(self, memory=10, c1=1e-4, c2=0.9):
+        self.memory = memory
+        self.c1 = c1
+        self.c2 = c2
+
+    def start(self, problem, x):
+        self.fx = problem.f(x)
+        self.g = problem.fd(x)
+        self.pairs = deque(maxlen=self.memory)  # (s, y, 1 / y^T s)
+
+    def direction(self):
+        q = self.g.copy()
+        alphas = []
+        for s, y, rho in reversed(self.pairs):
+            alpha = rho * (s @ q)
+            q -= alpha * y
+            alphas.append(alpha)
+        if self.pairs:
+            s, y, _ = self.pairs[-1]
+            q *= (s @ y) / (y @ y)
+        for (s, y, rho), alpha in zip(self.pairs, reversed(alphas)):
+            q += (alpha - rho * (y @ q)) * s
+        return -q
+
+    def step(self, problem, x):
+        d = self.direction()
+        if self.g @ d >= 0:  # Not a descent direction, start again from the gradient
+            self.pairs.clear()
+            d = -self.g
+        step, self.fx, g_new = wolfe(problem, x, self.fx, self.g, d, self.c1, self.c2)
+        x_new = x + step * d
+        s, y = x_new - x, g_new - self.g
+        if s @ y > 1e-12:  # Keep the curvature pairs which keep the inverse Hessian positive definite
+            self.pairs.append((s, y, 1 / (s @ y)))
+        self.g = g_new
+        return x_new
+
+
+class Newton:
+    # Newton steps with a backtracking line search, a gradient step where the Hessian gives no descent
+    def __init__(self, hess, shrink=0.5, c=1e-4):
+        self.hess = hess
+        self.shrink = shrink
+        self.c = c
+
+    def start(self, problem, x):
+        self.fx = problem.f(x)
+
+    def step(self, problem, x):
+        g = problem.fd(x)
+        try:
+            d = -np.linalg.solve(self.hess(x), g)
+        except np.linalg.LinAlgError:
+            d = -g
+        if g @ d >= 0:
+            d = -g
+        step, self.fx = armijo(problem, x, self.fx, g, d, 1., self.shrink, self.c)
+        return x + step * d
+
+
+METHODS = {
+    'gd': GradientDescent,
+    'momentum': Momentum,
+    'nesterov': Nesterov,
+    'adam': Adam,
+    'armijo': ArmijoDescent,
+    'lbfgs': LBFGS,
+    'newton': Newton,  # Needs hess=fdd
+}
+
+
+class OptResult:
+    def __init__(self, x, fun, nit, nfev, njev, time, xs, success):
+        self.x = x
+        self.fun = fun
+        self.nit = nit
+        self.nfev = nfev
+        self.njev = njev
+        self.time = time
+        self.xs = xs  # The trajectory (nit + 1, d), a view of the preallocated array
+        self.success = success
+
+    def __repr__(self):
+        return (f'OptResult(x={self.x}, fun={self.fun:.3g}, nit={self.nit}, nfev={self.nfev}, njev={self.njev}, '
+                f'time={self.time:.3g}, success={self.success})')
+
+
+def minimize(fun, x0, jac, method='lbfgs', tol=1e-6, max_iter=10000, record=True, **options):
+    # Stops when a step moves 'x' less than 'tol', 'options' go to the method, e.g. learn_rate=0.01
+    problem = Problem(fun, jac)
+    optimizer = METHODS[method](**options) if isinstance(method, str) else method
+    x = np.array(x0, dtype=float)
+    xs = np.empty((max_iter + 1, len(x)) if record else (1, len(x)))
+    xs[0] = x
+    start = time.perf_counter()
+    optimizer.start(problem, x)
+    nit, success = 0, False
+    while nit < max_iter:
+        x_new = optimizer.step(problem, x)
+        nit += 1
+        if record:
+            xs[nit] = x_new
+        success = np.linalg.norm(x_new - x) < tol
+        x = x_new
+        if success:
+            break
+    elapsed = time.perf_counter() - start
+    return OptResult(x, fun(x), nit, problem.nfev, problem.njev, elapsed, xs[:nit + 1] if record else None, success)
+
+
+class BatchResult:
+    def __init__(self, x, fun, nit, njev, time, success):
+        self.x = x  # (N, d), one row per initial point
+        self.fun = fun
+        self.nit = nit  # Iterations of each point
+        self.njev = njev  # Gradients of single points, summed over the batch
+        self.time = time
+        self.success = success
+
+
+def minimize_batch(fun, X0, jac, learn_rate=0.001, beta=0., tol=1e-6, max_iter=10000):
+    # Gradient descent (with momentum if 'beta' > 0) of N initial points at once
+    # 'fun' and 'jac' take x as (d, N) like 'f((xx, yy))', so x[0] is the first coordinate of all points
+    X = np.array(X0, dtype=float)
+    nit = np.full(len(X), max_iter)
+    success = np.zeros(len(X), dtype=bool)
+    ids, Xa, Va = np.arange(len(X)), X.copy(), np.zeros_like(X)  # The points which still move
+    njev = 0
+    start = time.perf_counter()
+    for it in range(max_iter):
+        if len(ids) == 0:
+            break
+        G = np.asarray(jac(Xa.T), dtype=float).T
+        njev += len(ids)
+        Va *= beta
+        Va -= learn_rate * G
+        Xa += Va
+        step = np.sqrt(np.einsum('ij,ij->i', Va, Va))
+        done = step < tol
+        stop = done | ~np.isfinite(step)
+        if stop.any():
+            # Converged and diverged points are written back and dropped from the batch
+            X[ids[stop]] = Xa[stop]
+            nit[ids[stop]] = it + 1
+            success[ids[done]] = True
+            ids, Xa, Va = ids[~stop], Xa[~stop], Va[~stop]
+    X[ids] = Xa
+    elapsed = time.perf_counter() - start
+    with np.errstate(over='ignore', invalid='ignore'):
+        f = np.asarray(fun(X.T), dtype=float)
+    return BatchResult(X, f, nit, njev, elapsed, success)
+
+
+def _scipy_minimize(args):
+    from scipy.optimize import minimize as scipy_minimize
+    fun, x0, jac, kwargs = args
+    result = scipy_minimize(fun, x0, jac=jac, **kwargs)
+    return result.x, result.fun, result.nit, result.nfev, result.success
+
+
+def minimize_many(fun, X0, jac=None, processes=None, **kwargs):
+    # Independent 'scipy.optimize.minimize' runs over a process pool, 'fun' and 'jac' must be picklable
+    # (module level functions or methods of 'symbolic_compile.CompiledFunction', not lambdas), 'kwargs' go to SciPy
+    X0 = np.asarray(X0, dtype=float)
+    tasks = [(fun, x0, jac, kwargs) for x0 in X0]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(processes) as pool:
+        results = list(pool.map(_scipy_minimize, tasks, chunksize=max(1, len(tasks) // (4 * (processes or 8)))))
+    elapsed = time.perf_counter() - start
+    x, f, nit, nfev, success = (np.array(values) for values in zip(*results))
+    return BatchResult(x, f, nit, nfev.sum(), elapsed, success)
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+
+CACHE_VERSION = 1  # Change it when the generated code changes, so cached functions are generated again
+
+def expression_key(str_fun, variables):
+    return hashlib.sha256(json.dumps([CACHE_VERSION, str_fun, variables]).encode()).hexdigest()
+
+
+def derive(str_fun, variables=None):
+    # The expression, its variables, gradient and Hessian (SymPy is imported only here)
+    import sympy
+    expr = sympy.sympify(str_fun)
+    symbols = sorted(expr.free_symbols, key=str) if variables is None else [sympy.Symbol(v) for v in variables]
+    grad = [sympy.diff(expr, v) for v in symbols]
+    hess = [[sympy.diff(g, v) for v in symbols] for g in grad]
+    return expr, symbols, grad, hess
+
+
+def generate_source(expr, symbols, grad, hess):
+    # NumPy code of f, fd and fdd, the common subexpressions of each are computed once
+    import sympy
+    from sympy.printing.numpy import NumPyPrinter
+    printer = NumPyPrinter()
+    n = len(symbols)
+    lines = ['import numpy\n']
+    functions = [('f', [expr], None), ('fd', grad, (n,)), ('fdd', [h for row in hess for h in row], (n, n))]
+    for name, exprs, shape in functions:
+        subs, reduced = sympy.cse(exprs, symbols=sympy.numbered_symbols('_c'))
+        lines.append(f'def {name}(_x):')
+        lines.append(f'    _x = numpy.asarray(_x, dtype=float)')
+        lines.append(f'    {", ".join(str(s) for s in symbols)}, = _x')
+        for sym, sub in subs:
+            lines.append(f'    {sym} = {printer.doprint(sub)}')
+        if shape is None:
+            lines.append(f'    return {printer.doprint(reduced[0])}\n')
+        else:
+            # Constant derivatives (e.g. 200) are filled to the shape of the points
+            values = ', '.join(printer.doprint(r) if r.free_symbols else f'numpy.full(_x.shape[1:], {printer.doprint(r)})'
+                               for r in reduced)
+            lines.append(f'    return numpy.array([{values}]).reshape({shape} + _x.shape[1:])\n')
+    return '\n'.join(lines)
+
+
+class CompiledFunction:
+    # f(x), fd(x) (gradient) and fdd(x) (Hessian) of an expression, 'x' is (d, ...) like 'f((xx, yy))'
+    # Pickled as the arguments of 'compile_function', so other processes (also 'spawn' ones) compile it
+    # again from the disk cache, and its bound methods can be sent to a process pool
+    def __init__(self, str_fun, variables, source, cached=False, spec=None):
+        self.str_fun = str_fun
+        self.variables = variables
+        self.source = source
+        self.cached = cached
+        self.spec = spec or (str_fun, variables)  # (str_fun, variables, cache_dir) of 'compile_function'
+
+        namespace = {}
+        exec(compile(source, f'<{str_fun}>', 'exec'), namespace)
+        self._f, self._fd, self._fdd = namespace['f'], namespace['fd'], namespace['fdd']
+
+    def __reduce__(self):
+        return compile_function, self.spec
+
+    def f(self, x):
+        return self._f(x)
+
+    def fd(self, x):
+        return self._fd(x)
+
+    def fdd(self, x):
+        return self._fdd(x)
+
+
+def compile_function(str_fun, variables=None, cache_dir='.sym_cache'):
+    # Symbolic derivation runs only once per expression, later runs load the generated code
+    key = expression_key(str_fun, variables)
+    cached = os.path.join(cache_dir, f'{key}.py') if cache_dir else None
+    if cached and os.path.exists(cached):
+        with open(cached, 'r') as f:
+            meta, source = f.read().split('\n', 1)
+        return CompiledFunction(str_fun, json.loads(meta[1:]), source, cached=True, spec=(str_fun, variables, cache_dir))
+
+    expr, symbols, grad, hess = derive(str_fun, variables)
+    key_variables, variables = variables, [str(s) for s in symbols]
+    source = generate_source(expr, symbols, grad, hess)
+    if cached:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cached + '.tmp', 'w') as f:
+            f.write('#' + json.dumps(variables) + '\n' + source)
+        os.replace(cached + '.tmp', cached)
+    return CompiledFunction(str_fun, variables, source, spec=(str_fun, key_variables, cache_dir))
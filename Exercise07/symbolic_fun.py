@@ -1,32 +1,32 @@
-from sympy import *
-from IPython.display import display
-import numpy as np
-from scipy.optimize import minimize
-import matplotlib
-import matplotlib.pyplot as plt
-matplotlib.use('TKAgg')
+import sys
+import symbolic_compile
 
 str_fun = "(1 - x_0)**2 + 100*(x_1 - x_0**2)**2"
-sym_fun = sympify(str_fun)
-display(sym_fun)
-x_0, x_1 = symbols('x_0 x_1')
-x = Matrix([[x_0, x_1]])
 
 
-# First derivatives
+def get_display():
+    # IPython's rich output in a notebook, plain text everywhere else
+    if 'IPython' in sys.modules:
+        from IPython import get_ipython
+        if get_ipython() is not None:
+            from IPython.display import display
+            return display
+    from sympy import pprint
+    return pprint
 
-fdx_0 = diff(sym_fun, x[0])
-fdx_1 = diff(sym_fun, x[1])
-fd = Matrix([fdx_0, fdx_1])
-display(fd)
 
-# Hessian (Second derivatives)
+def show_derivatives(str_fun, display=None):
+    from sympy import Matrix
+    display = display or get_display()
+    sym_fun, x, fd, fdd = symbolic_compile.derive(str_fun)
+    display(sym_fun)
 
-fdd = Matrix(
-    [
-        [diff(fdx_0, x_0), diff(fdx_0, x_1)],
-        [diff(fdx_1, x_0), diff(fdx_1, x_1)]
-    ]
-)
+    # First derivatives
+    display(Matrix(fd))
 
-display(fdd)
\ No newline at end of file
+    # Hessian (Second derivatives)
+    display(Matrix(fdd))
+
+
+if __name__ == '__main__':
+    show_derivatives(sys.argv[1] if len(sys.argv) > 1 else str_fun)